@@ -1,7 +1,30 @@
 import os
-import anthropic
+import time
+import asyncio
+import dataclasses
+from typing import Dict, List, Optional
 from temporalio import activity
-from shared_models import ClaudePromptInput, ClaudeResponse
+from temporalio.exceptions import ApplicationError
+from telemetry import record_duration, increment, start_span
+from shared_models import (
+    ClaudePromptInput,
+    ClaudeResponse,
+    ProjectMessagesInput,
+    TENANT_THROTTLED_ERROR,
+    CLAUDE_UNAVAILABLE_ERROR,
+    CONTEXT_WINDOW_EXCEEDED_ERROR,
+)
+from history_store import get_history_store
+from claim_check import get_claim_check_codec
+from tenant_limits import DEFAULT_TENANT, get_tenant_limiter
+from claude_pool import get_claude_pool
+from circuit_breaker import fallback_model, get_circuit_breaker
+from token_estimate import context_window, estimate_prompt_tokens
+
+# With CLAUDE_TOKEN_COUNT=exact, prompts estimated at more than this share of
+# the context window are counted exactly with the count-tokens API
+EXACT_COUNT_THRESHOLD = 0.9
+
 
 @activity.defn
 async def get_claude_response(input: ClaudePromptInput) -> ClaudeResponse:
@@ -12,42 +35,292 @@ async def get_claude_response(input: ClaudePromptInput) -> ClaudeResponse:
     Returns:
         Response from Claude API.
     """
-    # Get API key from environment
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+    messages = _prompt_messages(input)
+    
+    # A prompt that can't fit the context window would fail upstream on every
+    # attempt; reject it before it takes a tenant slot or reaches Claude
+    await _check_context_window(input, messages)
+    
+    # Fail fast rather than wait when the tenant already has its share of
+    # calls in progress: waiting would hold one of the worker's activity
+    # slots, which is exactly how a busy tenant starves everybody else. The
+    # error is non-retryable so it doesn't use up retry attempts; the calling
+    # workflow tries again after the delay in its details.
+    limiter = get_tenant_limiter()
+    if not limiter.acquire(input.tenant_id):
+        increment(activity.metric_meter(), "claude_tenant_throttled", "Claude calls deferred by the tenant limit",
+                  tenant=input.tenant_id or DEFAULT_TENANT)
+        raise ApplicationError(
+            f"Tenant {input.tenant_id or DEFAULT_TENANT} is at its limit of concurrent Claude calls",
+            float(os.environ.get("TENANT_THROTTLE_DELAY_SECONDS", 1)),
+            type=TENANT_THROTTLED_ERROR,
+            non_retryable=True,
+        )
+    try:
+        return await _call_with_circuit_breaker(input, messages)
+    finally:
+        limiter.release(input.tenant_id)
+
+
+def _prompt_messages(input: ClaudePromptInput) -> List[Dict]:
+    """The messages to send to Claude for a get_claude_response call."""
+    # Check if we have conversation history
+    if input.conversation_history:
+        # Use the conversation history for context
+        return input.conversation_history
+    # Just use the current prompt as a standalone message
+    return [
+        {
+            "role": "user",
+            "content": input.prompt
+        }
+    ]
+
+
+async def _check_context_window(input: ClaudePromptInput, messages: List[Dict]) -> None:
+    """
+    Check that the prompt plus max_tokens fits the model's context window,
+    using the caller's estimate when it has one (the chat workflow keeps a
+    per-message estimate), or estimating locally. With CLAUDE_TOKEN_COUNT=exact,
+    prompts close to the limit are counted with the count-tokens API instead.
+    Raises:
+        ApplicationError: Non-retryable ContextWindowExceeded if it can't fit
+    """
+    window = context_window(input.model)
+    tokens = input.estimated_input_tokens
+    if tokens is None:
+        tokens = estimate_prompt_tokens(messages)
+    source = "estimate"
+    
+    if tokens + input.max_tokens > window * EXACT_COUNT_THRESHOLD and os.environ.get("CLAUDE_TOKEN_COUNT") == "exact":
+        pool = get_claude_pool()
+        try:
+            count = await pool.client(pool.choose()).messages.count_tokens(model=input.model, messages=messages)
+            tokens = count.input_tokens
+            source = "count"
+        except Exception as e:
+            activity.logger.warning(f"Token count failed, using the estimate: {str(e)}")
     
-    # Create client
-    client = anthropic.Anthropic(api_key=api_key)
+    if tokens + input.max_tokens > window:
+        increment(activity.metric_meter(), "claude_context_window_rejections",
+                  "Claude calls rejected for not fitting the context window", model=input.model)
+        raise ApplicationError(
+            f"Prompt too long: {tokens} input tokens ({source}) plus max_tokens {input.max_tokens} "
+            f"exceeds the {window}-token context window of {input.model}",
+            type=CONTEXT_WINDOW_EXCEEDED_ERROR,
+            non_retryable=True,
+        )
+
+
+async def _call_with_circuit_breaker(input: ClaudePromptInput, messages: List[Dict]) -> ClaudeResponse:
+    """
+    Make the Claude call unless the model's circuit is open. While it is, use
+    the model's fallback (CLAUDE_FALLBACK_MODELS) if that one's circuit is
+    closed, or fail at once instead of waiting for a call that will most
+    likely time out. The error is non-retryable: retrying within the next
+    few seconds would only be rejected again.
+    """
+    meter = activity.metric_meter()
+    breaker = get_circuit_breaker(input.model)
+    generation = breaker.allow()
+    if generation is None:
+        fallback = fallback_model(input.model)
+        fallback_breaker = get_circuit_breaker(fallback) if fallback else None
+        generation = fallback_breaker.allow() if fallback_breaker is not None else None
+        if generation is None:
+            increment(meter, "claude_circuit_rejections", "Claude calls failed fast by an open circuit",
+                      model=input.model)
+            retry_after = breaker.retry_after()
+            raise ApplicationError(
+                f"Claude is unavailable for {input.model}, try again in {retry_after:.0f}s",
+                retry_after,
+                type=CLAUDE_UNAVAILABLE_ERROR,
+                non_retryable=True,
+            )
+        activity.logger.warning(f"Circuit for {input.model} is open, using {fallback}")
+        increment(meter, "claude_circuit_fallbacks", "Claude calls sent to the fallback model by an open circuit",
+                  model=input.model, fallback=fallback)
+        breaker = fallback_breaker
+        input = dataclasses.replace(input, model=fallback)
     
+    start = time.monotonic()
     try:
-        # Check if we have conversation history
-        if input.conversation_history:
-            # Use the conversation history for context
-            messages = input.conversation_history
-        else:
-            # Just use the current prompt as a standalone message
-            messages = [
-                {
-                    "role": "user",
-                    "content": input.prompt
-                }
-            ]
+        response = await _call_claude(input, messages)
+    except asyncio.CancelledError:
+        # Timed out (or no longer wanted): only the latency says something
+        breaker.record(generation, False, time.monotonic() - start)
+        raise
+    except Exception as e:
+        breaker.record(generation, _is_unavailable(e), time.monotonic() - start)
+        raise
+    breaker.record(generation, False, time.monotonic() - start)
+    return response
+
+
+async def _call_claude(input: ClaudePromptInput, messages: List[Dict]) -> ClaudeResponse:
+    """
+    Make the Claude call for get_claude_response through the client pool,
+    failing over to another endpoint when one is rate limited, overloaded or
+    unreachable.
+    """
+    pool = get_claude_pool()
+    
+    meter = activity.metric_meter()
+    if activity.info().attempt > 1:
+        increment(meter, "claude_activity_retries", "Retried Claude calls", model=input.model)
+    
+    endpoint = pool.choose()
+    tried = set()
+    while True:
+        tried.add(endpoint.name)
+        try:
+            response = await _stream_claude(pool.client(endpoint), endpoint.name, input, messages, meter)
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            increment(meter, "claude_endpoint_requests", "Claude calls per API endpoint",
+                      endpoint=endpoint.name, outcome=str(status) if status else type(e).__name__)
+            # 429s, 5xx (529 is "overloaded") and connection errors are about
+            # the endpoint, not the request: take it out of rotation for a
+            # while and try the next one
+            if status == 429 or _is_unavailable(e):
+                ejected_for = pool.report_failure(endpoint, _retry_after(e))
+                increment(meter, "claude_endpoint_ejections", "Claude API endpoints taken out of rotation",
+                          endpoint=endpoint.name)
+                next_endpoint = pool.choose(exclude=tried)
+                if next_endpoint is not None:
+                    activity.logger.warning(
+                        f"Claude endpoint {endpoint.name} failed ({str(e)}), ejected for {ejected_for:.0f}s; "
+                        f"failing over to {next_endpoint.name}"
+                    )
+                    endpoint = next_endpoint
+                    continue
+            activity.logger.error(f"Error calling Claude API: {str(e)}")
+            increment(meter, "claude_api_errors", "Failed Claude calls", model=input.model, error=type(e).__name__)
+            raise
         
-        # Call Claude API
-        message = client.messages.create(
+        pool.report_success(endpoint)
+        increment(meter, "claude_endpoint_requests", "Claude calls per API endpoint",
+                  endpoint=endpoint.name, outcome="ok")
+        return response
+
+
+async def _stream_claude(client, endpoint: str, input: ClaudePromptInput, messages: List[Dict], meter) -> ClaudeResponse:
+    """
+    Stream one Claude response with an AsyncAnthropic client and record its metrics.
+    Args:
+        client: The endpoint's anthropic.AsyncAnthropic client
+        endpoint: Name of the endpoint, for metrics
+        input: The Claude call's settings
+        messages: The messages to send
+        meter: Activity metric meter
+    """
+    # Call Claude API, streaming so time-to-first-token can be measured
+    start = time.monotonic()
+    with start_span(
+        "anthropic.messages.stream",
+        **{"claude.model": input.model, "claude.max_tokens": input.max_tokens, "claude.messages": len(messages),
+           "claude.endpoint": endpoint},
+    ) as span:
+        async with client.messages.stream(
             model=input.model,
             max_tokens=input.max_tokens,
             messages=messages
-        )
-        
-        # Extract text from the response
-        response_text = message.content[0].text
-        
-        return ClaudeResponse(
-            text=response_text,
-            request_id=message.id
-        )
-    except Exception as e:
-        activity.logger.error(f"Error calling Claude API: {str(e)}")
-        raise
\ No newline at end of file
+        ) as stream:
+            async for _ in stream.text_stream:
+                record_duration(
+                    meter, "claude_time_to_first_token", "Time until Claude streams its first token",
+                    start, model=input.model, endpoint=endpoint,
+                )
+                if span is not None:
+                    span.add_event("first_token")
+                break
+            message = await stream.get_final_message()
+        if span is not None:
+            span.set_attribute("claude.request_id", message.id)
+            span.set_attribute("claude.input_tokens", message.usage.input_tokens)
+            span.set_attribute("claude.output_tokens", message.usage.output_tokens)
+    latency_ms = (time.monotonic() - start) * 1000
+    record_duration(meter, "claude_api_latency", "Duration of Claude API calls", start,
+                    model=input.model, endpoint=endpoint)
+    
+    # Token usage; cache read/creation vs. input tokens gives the prompt cache hit rate
+    usage = message.usage
+    increment(meter, "claude_input_tokens", "Uncached input tokens sent to Claude",
+              usage.input_tokens, model=input.model)
+    increment(meter, "claude_output_tokens", "Output tokens generated by Claude",
+              usage.output_tokens, model=input.model)
+    increment(meter, "claude_cache_read_tokens", "Input tokens read from the prompt cache",
+              usage.cache_read_input_tokens or 0, model=input.model)
+    increment(meter, "claude_cache_creation_tokens", "Input tokens written to the prompt cache",
+              usage.cache_creation_input_tokens or 0, model=input.model)
+    
+    # Extract text from the response
+    response_text = message.content[0].text
+    
+    return ClaudeResponse(
+        text=response_text,
+        request_id=message.id,
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        cache_read_input_tokens=usage.cache_read_input_tokens or 0,
+        cache_creation_input_tokens=usage.cache_creation_input_tokens or 0,
+        stop_reason=message.stop_reason,
+        latency_ms=latency_ms
+    )
+
+
+def _is_unavailable(error: Exception) -> bool:
+    """Whether a failed call means Claude is failing (5xx, 529 "overloaded", no response) rather than the request."""
+    # Imported here rather than at module level: the SDK (with httpx and
+    # pydantic) takes a few hundred ms to import, and the worker should start
+    # polling without waiting for it. worker.py preloads it in the background.
+    import anthropic
+    return (getattr(error, "status_code", None) or 0) >= 500 or isinstance(error, anthropic.APIConnectionError)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """The Retry-After of a failed API response in seconds, if it has one."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"]) if response is not None else None
+    except (KeyError, ValueError):
+        return None
+
+
+@activity.defn
+async def project_messages(input: ProjectMessagesInput) -> None:
+    """
+    Activity that writes finished chat messages to the read-side history store,
+    so history reads don't need to query the workflow.
+    Args:
+        input: The conversation ID and the messages to write
+    """
+    store = get_history_store()
+    if store is None:
+        return
+    # The store blocks on disk (and on SQLite's write lock); keep that off
+    # the worker's event loop
+    await asyncio.to_thread(store.append_messages, input.conversation_id, input.messages)
+    if input.usage is not None:
+        await asyncio.to_thread(store.set_usage, input.conversation_id, dataclasses.asdict(input.usage))
+
+
+@activity.defn
+async def release_payload_blobs(workflow_ids: List[str]) -> int:
+    """
+    Activity that releases the claim-check blobs of ended workflows: a
+    conversation, or a batch and its chunk children.
+    Blobs still referenced by other workflows are kept; the rest are
+    deleted once they've been unreferenced for the grace period.
+    Args:
+        workflow_ids: The workflow IDs whose blobs to release
+    Returns:
+        Number of blobs deleted
+    """
+    codec = get_claim_check_codec()
+    if codec is None:
+        return 0
+    # SQLite, file and S3 deletes block; keep them off the worker's event loop
+    deleted = await asyncio.to_thread(codec.release, workflow_ids)
+    activity.logger.info(f"Deleted {deleted} payload blobs of {workflow_ids[0]} ({len(workflow_ids)} workflows)")
+    return deleted
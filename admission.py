@@ -0,0 +1,199 @@
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+import contextlib
+from typing import Awaitable, Callable, Iterator, Optional, Tuple
+
+from temporalio.api.enums.v1 import DescribeTaskQueueMode, TaskQueueType
+from temporalio.api.taskqueue.v1 import TaskQueue
+from temporalio.api.workflowservice.v1 import DescribeTaskQueueRequest
+from temporalio.client import Client
+from temporalio.common import MetricMeter
+
+
+logger = logging.getLogger(__name__)
+
+# Longest Retry-After the gateway asks clients to wait
+MAX_RETRY_AFTER_SECONDS = 60
+
+
+class Overloaded(Exception):
+    """
+    Raised when the gateway turns a request away instead of queueing it.
+    Args:
+        reason: "in_flight" (too many requests in this gateway, HTTP 429) or
+            "backlog" (workers are behind, HTTP 503)
+        retry_after: Seconds the client should wait before retrying
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(
+            "Too many requests in progress, try again later" if reason == "in_flight"
+            else "Service is overloaded, try again later"
+        )
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self) -> int:
+        return 429 if self.reason == "in_flight" else 503
+
+
+class AdmissionController:
+    """
+    Load shedding for gateway routes that start work on the workers.
+
+    Two limits, both checked without waiting so a saturated gateway answers
+    at once instead of piling up requests that would all time out together:
+      - max_in_flight: requests admitted at the same time in this process
+      - max_backlog: tasks waiting on the task queue, read in the background
+        with describe_task_queue every backlog_poll_seconds
+
+    A limit of 0 disables it. If the backlog can't be read (e.g. the server
+    doesn't support enhanced describe_task_queue), requests are admitted.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_backlog: int,
+        task_queue: str = "claude-queue",
+        backlog_poll_seconds: float = 2.0,
+        retry_after_seconds: int = 1,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_backlog = max_backlog
+        self.task_queue = task_queue
+        self.backlog_poll_seconds = backlog_poll_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight > 0 else None
+        self._lock = threading.Lock()
+
+        # Latest backlog reading: (tasks waiting, tasks dispatched per second, time.monotonic())
+        self._backlog: Optional[Tuple[int, float, float]] = None
+        self._watcher: Optional[threading.Thread] = None
+
+    def backlog(self) -> Optional[int]:
+        """Tasks waiting on the task queue, or None if unknown or out of date."""
+        reading = self._backlog
+        if reading is None or time.monotonic() - reading[2] > 3 * self.backlog_poll_seconds:
+            return None
+        return reading[0]
+
+    @contextlib.contextmanager
+    def admit(self) -> Iterator[None]:
+        """
+        Hold a slot for the duration of a request.
+        Raises:
+            Overloaded: The request must be rejected
+        """
+        self._check_backlog()
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            raise Overloaded("in_flight", self.retry_after_seconds)
+        try:
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def _check_backlog(self) -> None:
+        if self.max_backlog <= 0:
+            return
+        backlog = self.backlog()
+        if backlog is None or backlog < self.max_backlog:
+            return
+
+        # Ask the client to come back once workers should have drained the
+        # excess at the current dispatch rate
+        _, dispatch_rate, _ = self._backlog
+        retry_after = self.retry_after_seconds
+        if dispatch_rate > 0:
+            retry_after = max(retry_after, math.ceil((backlog - self.max_backlog + 1) / dispatch_rate))
+        raise Overloaded("backlog", min(retry_after, MAX_RETRY_AFTER_SECONDS))
+
+    def watch_backlog(self, connect: Callable[[], Awaitable[Client]], meter: Optional[MetricMeter] = None) -> None:
+        """
+        Start reading the task queue backlog in a background thread. Does
+        nothing if backlog limiting is disabled or the thread already runs.
+        Args:
+            connect: Coroutine function returning a connected Temporal client
+            meter: Optional meter to export the backlog on as claude_task_queue_backlog
+        """
+        if self.max_backlog <= 0:
+            return
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(
+                target=lambda: asyncio.run(self._poll_backlog(connect, meter)),
+                name="backlog-watcher",
+                daemon=True,
+            )
+        self._watcher.start()
+
+    async def _poll_backlog(self, connect: Callable[[], Awaitable[Client]], meter: Optional[MetricMeter]) -> None:
+        client = None
+        gauge = meter.create_gauge("claude_task_queue_backlog", "Approximate tasks waiting on the task queue") if meter else None
+        while True:
+            try:
+                if client is None:
+                    client = await connect()
+                backlog, dispatch_rate = await describe_backlog(client, self.task_queue)
+                self._backlog = (backlog, dispatch_rate, time.monotonic())
+                if gauge is not None:
+                    gauge.set(backlog, {"task_queue": self.task_queue})
+            except Exception as e:
+                logger.warning(f"Failed to read backlog of task queue {self.task_queue}: {str(e)}")
+            await asyncio.sleep(self.backlog_poll_seconds)
+
+
+async def describe_backlog(client: Client, task_queue: str) -> Tuple[int, float]:
+    """
+    Read a task queue's backlog with describe_task_queue.
+    Args:
+        client: Temporal client
+        task_queue: Task queue name
+    Returns:
+        (approximate workflow and activity tasks waiting, tasks dispatched per second)
+    """
+    # Stats are only reported in enhanced mode (Temporal Server 1.25+)
+    request = DescribeTaskQueueRequest(
+        namespace=client.namespace,
+        task_queue=TaskQueue(name=task_queue),
+        api_mode=DescribeTaskQueueMode.DESCRIBE_TASK_QUEUE_MODE_ENHANCED,
+        task_queue_types=[TaskQueueType.TASK_QUEUE_TYPE_WORKFLOW, TaskQueueType.TASK_QUEUE_TYPE_ACTIVITY],
+        report_stats=True,
+    )
+    response = await client.workflow_service.describe_task_queue(request)
+    backlog = 0
+    dispatch_rate = 0.0
+    for version_info in response.versions_info.values():
+        for type_info in version_info.types_info.values():
+            backlog += type_info.stats.approximate_backlog_count
+            dispatch_rate += type_info.stats.tasks_dispatch_rate
+    return backlog, dispatch_rate
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """
+    Get the process-wide admission controller, configured by
+    GATEWAY_MAX_IN_FLIGHT, GATEWAY_MAX_BACKLOG, GATEWAY_BACKLOG_POLL_SECONDS
+    and GATEWAY_RETRY_AFTER_SECONDS.
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                max_in_flight=int(os.environ.get("GATEWAY_MAX_IN_FLIGHT", 64)),
+                max_backlog=int(os.environ.get("GATEWAY_MAX_BACKLOG", 200)),
+                backlog_poll_seconds=float(os.environ.get("GATEWAY_BACKLOG_POLL_SECONDS", 2)),
+                retry_after_seconds=int(os.environ.get("GATEWAY_RETRY_AFTER_SECONDS", 1)),
+            )
+    return _controller
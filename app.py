@@ -1,10 +1,41 @@
 import os
+import re
 import asyncio
-from flask import Flask, request, jsonify, render_template
+import base64
+import dataclasses
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+import threading
+from flask import Flask, request, jsonify, render_template, g
 from dotenv import load_dotenv
-from temporalio.client import Client, TLSConfig
-from workflows import ClaudeChatWorkflow
-from shared_models import ClaudePromptInput
+from temporalio.client import Client, TLSConfig, WithStartWorkflowOperation
+from temporalio.client import WorkflowExecutionStatus
+from temporalio.common import WorkflowIDConflictPolicy, WorkflowIDReusePolicy
+from temporalio.exceptions import WorkflowAlreadyStartedError
+from workflows import ClaudeChatWorkflow, ClaudeBatchWorkflow
+from shared_models import (
+    ClaudePromptInput,
+    ClaudeBatchInput,
+    ClaudeBatchResult,
+    CLAUDE_MODEL_ATTR,
+    CLAUDE_TURN_COUNT_ATTR,
+    CLAUDE_LAST_ACTIVITY_ATTR,
+    CLAUDE_STATUS_ATTR,
+    PRIORITY_TASK_QUEUES,
+)
+from history_store import get_history_store
+from converter import get_data_converter
+from claim_check import payload_owner
+from admission import Overloaded, get_admission_controller
+from telemetry import (
+    create_runtime,
+    configure_tracing,
+    start_span,
+    record_duration,
+    increment,
+    TemporalCallMetricsInterceptor,
+)
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +45,65 @@ app = Flask(__name__, static_folder="static")
 
 # Global variables
 temporal_client = None
+metrics_runtime = None
+tracing_interceptors = None
+_metrics_runtime_lock = threading.Lock()
+
+
+def get_metrics_runtime():
+    """
+    Get or create the Temporal runtime that serves the gateway's metrics on
+    GATEWAY_METRICS_ADDRESS. Created lazily so only the process that serves
+    requests binds the port (not the Flask reloader's parent).
+    """
+    global metrics_runtime
+    with _metrics_runtime_lock:
+        if metrics_runtime is None:
+            metrics_runtime = create_runtime(os.environ.get("GATEWAY_METRICS_ADDRESS", "0.0.0.0:9465"))
+    return metrics_runtime
+
+
+def get_tracing_interceptors():
+    """Set up tracing once per process and get the client interceptors for it."""
+    global tracing_interceptors
+    with _metrics_runtime_lock:
+        if tracing_interceptors is None:
+            tracing_interceptors = configure_tracing("claude-gateway")
+    return tracing_interceptors
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.monotonic()
+    
+    # Root span for the request; Temporal calls made while handling it
+    # (and through them the workflow and activities) become its children
+    get_tracing_interceptors()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.request_span = start_span(f"{request.method} {route}", **{"http.method": request.method, "http.route": route})
+    g.request_span.__enter__()
+
+
+@app.teardown_request
+def _end_request_span(exc):
+    if "request_span" in g:
+        g.request_span.__exit__(type(exc) if exc else None, exc, exc.__traceback__ if exc else None)
+
+
+@app.after_request
+def _record_request_latency(response):
+    """Record gateway latency per route."""
+    if "request_start" in g:
+        record_duration(
+            get_metrics_runtime().metric_meter,
+            "claude_gateway_request_latency",
+            "Latency of gateway HTTP requests",
+            g.request_start,
+            route=request.url_rule.rule if request.url_rule else "unmatched",
+            method=request.method,
+            status=str(response.status_code),
+        )
+    return response
 
 
 def get_temporal_client():
@@ -35,6 +125,12 @@ def get_temporal_client():
 
 async def _init_temporal_client_async():
     """Async function to initialize the Temporal client."""
+    # Export client metrics, time every Temporal call and propagate traces
+    runtime = get_metrics_runtime()
+    interceptors = [TemporalCallMetricsInterceptor(runtime.metric_meter)] + get_tracing_interceptors()
+    # Faster JSON payload converter, wire-compatible with the default one
+    data_converter = get_data_converter()
+    
     # Get Temporal connection settings
     is_cloud = os.environ.get("TEMPORAL_ADDRESS", "").endswith("tmprl.cloud:7233")
     
@@ -58,15 +154,99 @@ async def _init_temporal_client_async():
             os.environ.get("TEMPORAL_ADDRESS", ""),
             namespace=os.environ.get("TEMPORAL_NAMESPACE", "default"),
             tls=tls_config,
+            runtime=runtime,
+            interceptors=interceptors,
+            data_converter=data_converter,
         )
     else:
         # Connect to local Temporal server
         app.logger.info("Connecting to local Temporal server")
-        client = await Client.connect("localhost:7233")
+        client = await Client.connect(
+            os.environ.get("TEMPORAL_ADDRESS") or "localhost:7233",
+            runtime=runtime,
+            interceptors=interceptors,
+            data_converter=data_converter,
+        )
     
     return client
 
 
+def get_admission():
+    """Get the admission controller, watching the task queue backlog from the first request on."""
+    controller = get_admission_controller()
+    controller.watch_backlog(_init_temporal_client_async, get_metrics_runtime().metric_meter)
+    return controller
+
+
+def overloaded_response(error):
+    """Turn an Overloaded rejection into a 429/503 response with Retry-After."""
+    increment(
+        get_metrics_runtime().metric_meter,
+        "claude_gateway_rejections",
+        "Requests turned away by admission control",
+        reason=error.reason,
+        route=request.url_rule.rule if request.url_rule else "unmatched",
+    )
+    response = jsonify({"error": str(error), "retryAfter": error.retry_after})
+    response.status_code = error.status_code
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+# Tenant IDs become metric labels, so keep them short and simple
+_TENANT_ID_RE = re.compile(r"^[A-Za-z0-9_.:@\-]{1,128}$")
+
+
+def get_tenant_id(data):
+    """
+    Identify who a request is for, for per-tenant fair scheduling: the
+    X-Tenant-ID header (e.g. set by an authenticating proxy), else the JSON
+    body's tenantId. The client address is deliberately not used: behind a
+    reverse proxy every user would share one tenant and its limit.
+    Returns:
+        The tenant ID, or None if the request names no tenant (its Claude
+        calls are then not limited per tenant)
+    Raises:
+        ValueError: The tenant ID isn't valid
+    """
+    tenant_id = request.headers.get("X-Tenant-ID") or data.get("tenantId")
+    if tenant_id is None:
+        return None
+    if not isinstance(tenant_id, str) or not _TENANT_ID_RE.match(tenant_id):
+        raise ValueError("Invalid tenant ID")
+    return tenant_id
+
+
+def is_positive_int(value):
+    """Whether a JSON value is an integer above 0 (JSON true/false are not)."""
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def new_workflow_id(prefix, request_id=None):
+    """
+    Build a collision-free workflow ID.
+    Args:
+        prefix: ID prefix, e.g. "claude-chat"
+        request_id: Optional client-supplied request ID. The same request ID
+            always maps to the same workflow ID, so client retries are idempotent.
+    Returns:
+        "<prefix>-<uuid>", where the UUID is a time-sortable UUIDv7 when no
+        request ID is given
+    """
+    if request_id:
+        return f"{prefix}-{uuid.uuid5(uuid.NAMESPACE_URL, f'{prefix}/{request_id}')}"
+
+    # UUIDv7: 48-bit unix epoch milliseconds followed by 74 random bits
+    unix_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (unix_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76  # version
+    value |= ((rand >> 62) & 0xFFF) << 64  # rand_a
+    value |= 0b10 << 62  # variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF  # rand_b
+    return f"{prefix}-{uuid.UUID(int=value)}"
+
+
 @app.route("/")
 def index():
     """Render the main page."""
@@ -75,7 +255,11 @@ def index():
 
 @app.route("/api/chat", methods=["POST"])
 def start_or_continue_chat():
-    """API endpoint to start a new chat or continue an existing one."""
+    """
+    API endpoint to start a new chat or continue an existing one.
+    Both cases are a single update-with-start call, so the client doesn't need
+    to know whether the conversation already exists.
+    """
     try:
         # Get request data
         data = request.json
@@ -83,109 +267,108 @@ def start_or_continue_chat():
             return jsonify({"error": "Invalid JSON data"}), 400
             
         prompt = data.get("prompt")
-        model = data.get("model", "claude-3-7-sonnet-20250219")
-        max_tokens = data.get("maxTokens", 1024)
         conversation_id = data.get("conversationId")
+        request_id = data.get("requestId")
         
         if not prompt:
             return jsonify({"error": "Prompt is required"}), 400
         
-        # Execute the appropriate action
-        if conversation_id:
-            # Continue existing conversation
-            result = continue_conversation(conversation_id, prompt)
-        else:
-            # Start new conversation
-            result = start_conversation(prompt, model, max_tokens)
+        try:
+            tenant_id = get_tenant_id(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        priority = data.get("priority", "interactive")
+        if priority not in PRIORITY_TASK_QUEUES:
+            return jsonify({"error": f"priority must be one of {', '.join(PRIORITY_TASK_QUEUES)}"}), 400
+        
+        # Checked here, since a bad value would only fail inside the workflow
+        max_tokens = data.get("maxTokens", 1024)
+        inactivity_timeout_seconds = data.get("inactivityTimeoutSeconds", 30 * 60)
+        for name, value in (("maxTokens", max_tokens), ("inactivityTimeoutSeconds", inactivity_timeout_seconds)):
+            if not is_positive_int(value):
+                return jsonify({"error": f"{name} must be a positive integer"}), 400
+        context_window_messages = data.get("contextWindowMessages")
+        if context_window_messages is not None and not is_positive_int(context_window_messages):
+            return jsonify({"error": "contextWindowMessages must be a positive integer or null"}), 400
+        
+        # Conversation settings, only used if this request starts the conversation
+        settings = ClaudePromptInput(
+            prompt="",
+            model=data.get("model", "claude-3-7-sonnet-20250219"),
+            max_tokens=max_tokens,
+            batch_pending_messages=data.get("batchMessages", False),
+            inactivity_timeout_seconds=inactivity_timeout_seconds,
+            context_window_messages=context_window_messages,
+            tenant_id=tenant_id,
+            priority=priority,
+        )
+        
+        # Shed load before starting any work rather than queueing behind a backlog
+        with get_admission().admit():
+            result = send_chat_message(conversation_id, prompt, settings, request_id)
         
         return jsonify(result)
     
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         app.logger.error(f"Error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
-def start_conversation(prompt, model, max_tokens):
-    """Start a new conversation workflow."""
+def send_chat_message(conversation_id, prompt, settings, request_id=None):
+    """Send a message to a conversation, starting the conversation if needed."""
     def run_async():
         import asyncio
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        return loop.run_until_complete(_start_conversation_async(prompt, model, max_tokens))
+        return loop.run_until_complete(
+            _send_chat_message_async(conversation_id, prompt, settings, request_id)
+        )
     
     return run_async()
 
 
-async def _start_conversation_async(prompt, model, max_tokens):
-    """Async implementation to start a new conversation workflow."""
+async def _send_chat_message_async(conversation_id, prompt, settings, request_id=None):
+    """
+    Async implementation to send a message with update-with-start.
+    Args:
+        conversation_id: Existing conversation ID, or None to start a new one
+        prompt: The user message
+        settings: Workflow input used if the conversation has to be started.
+            Its prompt is empty; the message is delivered as the update.
+        request_id: Optional client request ID for idempotent retries
+    """
     # Get Temporal client
     client = await _init_temporal_client_async()
     
-    # Prepare the input
-    workflow_input = ClaudePromptInput(
-        prompt=prompt,
-        model=model,
-        max_tokens=max_tokens
-    )
+    # Generate a unique workflow ID for a new conversation (stable per client request ID)
+    if not conversation_id:
+        conversation_id = new_workflow_id("claude-chat", request_id)
     
-    # Generate a unique workflow ID for this conversation
-    conversation_id = f"claude-chat-{int(asyncio.get_event_loop().time() * 1000)}"
-    
-    # Start the workflow
-    handle = await client.start_workflow(
+    # Used only if the conversation isn't running yet
+    start_operation = WithStartWorkflowOperation(
         ClaudeChatWorkflow.run,
-        workflow_input,
+        settings,
         id=conversation_id,
         task_queue="claude-queue",
+        id_conflict_policy=WorkflowIDConflictPolicy.USE_EXISTING,
+        id_reuse_policy=WorkflowIDReusePolicy.REJECT_DUPLICATE,
     )
     
-    app.logger.info(f"Started chat workflow with ID: {conversation_id}")
-    
-    # Wait for the first response
-    # We need to query the workflow to get the response
-    # First, we need to wait a bit for the workflow to process the message
-    await asyncio.sleep(2)
-    
-    # Get the workflow handle again (now that it's been running for a bit)
-    handle = client.get_workflow_handle(conversation_id)
-    
-    # Query the workflow for the last assistant message
-    response = await handle.query(ClaudeChatWorkflow.get_last_assistant_message)
-    
-    return {
-        "text": response,
-        "conversationId": conversation_id
-    }
-
-
-def continue_conversation(conversation_id, message):
-    """Send a new message to an existing conversation."""
-    def run_async():
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(_continue_conversation_async(conversation_id, message))
-    
-    return run_async()
-
-
-async def _continue_conversation_async(conversation_id, message):
-    """Async implementation to continue an existing conversation."""
-    # Get Temporal client
-    client = await _init_temporal_client_async()
-    
     try:
-        # Get the workflow handle
-        handle = client.get_workflow_handle(conversation_id)
-        
-        # Send the message signal
-        await handle.signal(ClaudeChatWorkflow.send_message, message)
-        
-        # Wait a bit for the workflow to process the message
-        await asyncio.sleep(2)
-        
-        # Query the workflow for the last assistant message
-        response = await handle.query(ClaudeChatWorkflow.get_last_assistant_message)
+        # Start the workflow if needed, deliver the message and wait for the
+        # reply in one round trip. The request ID doubles as the update ID, so
+        # a retried request is de-duplicated by the server. A long message
+        # offloaded by the claim-check codec is attributed to this conversation.
+        with payload_owner(conversation_id):
+            response = await client.execute_update_with_start_workflow(
+                ClaudeChatWorkflow.chat,
+                prompt,
+                start_workflow_operation=start_operation,
+                id=request_id,
+            )
         
         return {
             "text": response,
@@ -199,15 +382,29 @@ async def _continue_conversation_async(conversation_id, message):
         }
 
 
+# Page size limits for /api/history
+HISTORY_DEFAULT_LIMIT = 100
+HISTORY_MAX_LIMIT = 1000
+
+
 @app.route("/api/history/<conversation_id>", methods=["GET"])
 def get_chat_history(conversation_id):
-    """Get the full history of a conversation."""
+    """
+    Get a page of a conversation's history.
+    Query parameters:
+        cursor: Index of the first message to return (default 0). Pass the
+            previous response's nextCursor to fetch only newer messages.
+        limit: Page size (default 100, at most 1000)
+    """
     try:
+        cursor = max(0, request.args.get("cursor", 0, type=int))
+        limit = min(max(1, request.args.get("limit", HISTORY_DEFAULT_LIMIT, type=int)), HISTORY_MAX_LIMIT)
+        
         def run_async():
             import asyncio
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            return loop.run_until_complete(_get_chat_history_async(conversation_id))
+            return loop.run_until_complete(_get_chat_history_async(conversation_id, cursor, limit))
         
         history = run_async()
         return jsonify(history)
@@ -217,18 +414,140 @@ def get_chat_history(conversation_id):
         return jsonify({"error": str(e)}), 500
 
 
-async def _get_chat_history_async(conversation_id):
-    """Async implementation to get chat history."""
+async def _get_chat_history_async(conversation_id, cursor=0, limit=HISTORY_DEFAULT_LIMIT):
+    """
+    Async implementation to get a page of chat history.
+    Reads from the history store when it has the conversation, and falls back
+    to querying the workflow otherwise.
+    """
+    # Fetch one extra message to learn whether another page follows
+    messages = None
+    usage = None
+    store = get_history_store()
+    if store is not None:
+        messages = store.get_messages(conversation_id, cursor, limit + 1)
+        if not messages and cursor == 0:
+            # Nothing projected for this conversation (yet)
+            messages = None
+        else:
+            usage = store.get_usage(conversation_id)
+    
+    increment(
+        get_metrics_runtime().metric_meter,
+        "claude_history_reads",
+        "History reads by source; store vs. workflow is the read store hit rate",
+        source="workflow" if messages is None else "store",
+    )
+    
+    if messages is None:
+        # Get Temporal client
+        client = await _init_temporal_client_async()
+        
+        # Get the workflow handle
+        handle = client.get_workflow_handle(conversation_id)
+        
+        messages = await handle.query(
+            ClaudeChatWorkflow.get_conversation_history, args=[cursor, limit + 1]
+        )
+        usage = dataclasses.asdict(await handle.query(ClaudeChatWorkflow.get_token_usage))
+    
+    page = messages[:limit]
+    return {
+        "conversationId": conversation_id,
+        "messages": page,
+        # Indices, not a row count, so a page that skips indices doesn't
+        # make the client fetch the same messages again
+        "nextCursor": page[-1]["index"] + 1 if page else cursor,
+        "hasMore": len(messages) > limit,
+        "usage": usage,
+    }
+
+# Route to list and search conversations
+
+# Filter values are interpolated into a visibility query, so keep them simple
+_FILTER_VALUE_RE = re.compile(r"^[A-Za-z0-9_.:\-]+$")
+
+
+@app.route("/api/conversations", methods=["GET"])
+def list_conversations():
+    """
+    List conversations using the workflow's search attributes.
+    Query parameters:
+        status: Conversation status ("idle", "processing", "expired" or "ended")
+        model: Claude model name
+        minTurns: Only conversations with at least this many turns
+        idleMinutes: Only conversations with no activity for this many minutes
+        running: "false" to include closed conversations (default "true")
+        pageSize: Page size (default 50, at most 1000)
+        pageToken: nextPageToken from the previous response
+    """
+    try:
+        filters = ["WorkflowType = 'ClaudeChatWorkflow'"]
+        if request.args.get("running", "true").lower() != "false":
+            filters.append("ExecutionStatus = 'Running'")
+        
+        for param, attr in (("status", CLAUDE_STATUS_ATTR), ("model", CLAUDE_MODEL_ATTR)):
+            value = request.args.get(param)
+            if value:
+                if not _FILTER_VALUE_RE.match(value):
+                    return jsonify({"error": f"Invalid {param}"}), 400
+                filters.append(f"{attr.name} = '{value}'")
+        
+        min_turns = request.args.get("minTurns", type=int)
+        if min_turns is not None:
+            filters.append(f"{CLAUDE_TURN_COUNT_ATTR.name} >= {min_turns}")
+        
+        idle_minutes = request.args.get("idleMinutes", type=int)
+        if idle_minutes is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(minutes=idle_minutes)
+            filters.append(f"{CLAUDE_LAST_ACTIVITY_ATTR.name} < '{cutoff.isoformat()}'")
+        
+        page_size = min(max(1, request.args.get("pageSize", 50, type=int)), 1000)
+        page_token = request.args.get("pageToken")
+        page_token = base64.urlsafe_b64decode(page_token) if page_token else None
+        
+        def run_async():
+            import asyncio
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            return loop.run_until_complete(
+                _list_conversations_async(" AND ".join(filters), page_size, page_token)
+            )
+        
+        return jsonify(run_async())
+    
+    except Exception as e:
+        app.logger.error(f"Error listing conversations: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+async def _list_conversations_async(query, page_size, page_token=None):
+    """Async implementation to fetch one page of conversations from visibility."""
     # Get Temporal client
     client = await _init_temporal_client_async()
     
-    # Get the workflow handle
-    handle = client.get_workflow_handle(conversation_id)
+    workflows = client.list_workflows(query, page_size=page_size, next_page_token=page_token)
+    await workflows.fetch_next_page()
     
-    # Query the workflow for the conversation history
-    history = await handle.query(ClaudeChatWorkflow.get_conversation_history)
+    conversations = []
+    for execution in workflows.current_page or []:
+        attrs = execution.typed_search_attributes
+        last_activity = attrs.get(CLAUDE_LAST_ACTIVITY_ATTR)
+        conversations.append({
+            "conversationId": execution.id,
+            "executionStatus": execution.status.name.lower() if execution.status else None,
+            "startTime": execution.start_time.isoformat(),
+            "model": attrs.get(CLAUDE_MODEL_ATTR),
+            "turnCount": attrs.get(CLAUDE_TURN_COUNT_ATTR),
+            "lastActivity": last_activity.isoformat() if last_activity else None,
+            "status": attrs.get(CLAUDE_STATUS_ATTR),
+        })
     
-    return history
+    next_token = workflows.next_page_token
+    return {
+        "conversations": conversations,
+        "nextPageToken": base64.urlsafe_b64encode(next_token).decode() if next_token else None,
+    }
 
 # Route to end conversation & terminate the Workflow
 
@@ -280,6 +599,139 @@ async def _end_conversation_async(conversation_id):
             "error": f"Failed to end conversation: {str(e)}"
         }
 
+
+# Routes for batch (fan-out) prompt runs
+
+@app.route("/api/batch", methods=["POST"])
+def start_batch():
+    """API endpoint to run many prompts concurrently under one workflow."""
+    try:
+        data = request.json
+        if not data:
+            return jsonify({"error": "Invalid JSON data"}), 400
+
+        prompts = data.get("prompts")
+        if not prompts or not isinstance(prompts, list):
+            return jsonify({"error": "A non-empty list of prompts is required"}), 400
+        if not all(isinstance(prompt, str) and prompt for prompt in prompts):
+            return jsonify({"error": "Every prompt must be a non-empty string"}), 400
+
+        # Checked here, since a bad value would only fail inside the workflow
+        max_concurrency = data.get("maxConcurrency", 5)
+        chunk_size = data.get("chunkSize", 100)
+        max_tokens = data.get("maxTokens", 1024)
+        for name, value in (("maxConcurrency", max_concurrency), ("chunkSize", chunk_size), ("maxTokens", max_tokens)):
+            if not is_positive_int(value):
+                return jsonify({"error": f"{name} must be a positive integer"}), 400
+
+        try:
+            tenant_id = get_tenant_id(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        priority = data.get("priority", "background")
+        if priority not in PRIORITY_TASK_QUEUES:
+            return jsonify({"error": f"priority must be one of {', '.join(PRIORITY_TASK_QUEUES)}"}), 400
+
+        batch_input = ClaudeBatchInput(
+            prompts=prompts,
+            model=data.get("model", "claude-3-7-sonnet-20250219"),
+            max_tokens=max_tokens,
+            max_concurrency=max_concurrency,
+            chunk_size=chunk_size,
+            tenant_id=tenant_id,
+            priority=priority,
+        )
+
+        def run_async():
+            import asyncio
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            return loop.run_until_complete(_start_batch_async(batch_input, data.get("requestId")))
+
+        with get_admission().admit():
+            return jsonify(run_async())
+
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        app.logger.error(f"Error starting batch: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+async def _start_batch_async(batch_input, request_id=None):
+    """Async implementation to start a batch workflow."""
+    # Get Temporal client
+    client = await _init_temporal_client_async()
+
+    batch_id = new_workflow_id("claude-batch", request_id)
+    try:
+        # A retried request gets the batch its first attempt started, whether
+        # that is still running (USE_EXISTING) or has finished
+        # (REJECT_DUPLICATE), instead of paying for every prompt again.
+        # Offloaded prompts belong to the batch, which releases them when done.
+        with payload_owner(batch_id):
+            await client.start_workflow(
+                ClaudeBatchWorkflow.run,
+                batch_input,
+                id=batch_id,
+                task_queue="claude-queue",
+                id_conflict_policy=WorkflowIDConflictPolicy.USE_EXISTING,
+                id_reuse_policy=WorkflowIDReusePolicy.REJECT_DUPLICATE,
+            )
+    except WorkflowAlreadyStartedError:
+        app.logger.info(f"Batch workflow {batch_id} already ran for request {request_id}")
+        return {"batchId": batch_id}
+
+    app.logger.info(f"Started batch workflow with ID: {batch_id} ({len(batch_input.prompts)} prompts)")
+
+    return {"batchId": batch_id}
+
+
+@app.route("/api/batch/<batch_id>", methods=["GET"])
+def get_batch(batch_id):
+    """Get the progress of a batch, plus its results once it has finished."""
+    try:
+        def run_async():
+            import asyncio
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            return loop.run_until_complete(_get_batch_async(batch_id))
+
+        return jsonify(run_async())
+
+    except Exception as e:
+        app.logger.error(f"Error getting batch {batch_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+async def _get_batch_async(batch_id):
+    """Async implementation to get batch progress and results."""
+    # Get Temporal client
+    client = await _init_temporal_client_async()
+
+    handle = client.get_workflow_handle(batch_id)
+    description = await handle.describe()
+
+    if description.status == WorkflowExecutionStatus.COMPLETED:
+        result = await handle.result(result_type=ClaudeBatchResult)
+        return {
+            "batchId": batch_id,
+            "status": "completed",
+            "results": [
+                {"index": item.index, "text": item.text, "error": item.error}
+                for item in result.items
+            ],
+            "usage": dataclasses.asdict(result.usage),
+        }
+
+    progress = await handle.query(ClaudeBatchWorkflow.get_progress)
+    return {
+        "batchId": batch_id,
+        "status": description.status.name.lower() if description.status else "unknown",
+        "progress": progress,
+    }
+
 if __name__ == "__main__":
     # Run the Flask app
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Cost of Claude calls during an upstream outage, with and without the
+circuit breaker.
+
+Runs get_claude_response against a mock Anthropic server that answers every
+request with 529 (overloaded), like during an incident, and reports how long
+the average failed activity took (i.e. how long it held a worker slot) and
+how many requests reached the upstream. With the breaker on, calls after the
+first --min-calls fail in microseconds without a request.
+
+Usage:
+    python benchmarks/bench_circuit_breaker.py --calls 100 --concurrency 10
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Measure the breaker alone, without the per-tenant limit
+os.environ["TENANT_MAX_CONCURRENT_CALLS"] = "0"
+
+from temporalio.testing import ActivityEnvironment  # noqa: E402
+
+import activities  # noqa: E402
+import circuit_breaker  # noqa: E402
+import claude_pool  # noqa: E402
+from mock_claude_server import MockConfig, start_mock_server  # noqa: E402
+from shared_models import ClaudePromptInput  # noqa: E402
+
+MODEL = "claude-3-7-sonnet-20250219"
+
+
+async def run_calls(calls: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    succeeded = 0
+
+    async def one_call(i: int) -> None:
+        nonlocal succeeded
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await ActivityEnvironment().run(
+                    activities.get_claude_response, ClaudePromptInput(prompt=f"prompt {i}", model=MODEL, max_tokens=50)
+                )
+                succeeded += 1
+            except Exception:
+                pass
+            durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call(i) for i in range(calls)))
+    return {"elapsed": time.perf_counter() - start, "durations": durations, "succeeded": succeeded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--min-calls", type=int, default=10, help="CLAUDE_CIRCUIT_MIN_CALLS")
+    args = parser.parse_args()
+    # The activity logs every failure
+    logging.disable(logging.CRITICAL)
+
+    outage, outage_stats = start_mock_server(MockConfig(rate_529=1.0))
+    os.environ["ANTHROPIC_API_KEY"] = "mock"
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{outage.server_address[1]}"
+
+    runs = [("breaker off", {"CLAUDE_CIRCUIT_MIN_CALLS": str(10 ** 9)}),
+            ("breaker on", {"CLAUDE_CIRCUIT_MIN_CALLS": str(args.min_calls)})]
+
+    print(f"{args.calls} calls, {args.concurrency} at a time, upstream answering 529")
+    for label, env in runs:
+        os.environ.update(env)
+        # Fresh breakers, and clients for the new event loop
+        circuit_breaker._breakers.clear()
+        claude_pool._pool = None
+        outage_requests = outage_stats.requests
+        result = asyncio.run(run_calls(args.calls, args.concurrency))
+        durations = result["durations"]
+        print(f"{label:<12} mean {statistics.mean(durations) * 1000:8.1f} ms/call, "
+              f"p50 {statistics.median(durations) * 1000:8.1f} ms, "
+              f"{outage_stats.requests - outage_requests:4d} upstream requests, "
+              f"{result['succeeded']} succeeded, {result['elapsed']:.1f}s total")
+
+    outage.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Throughput of get_claude_response against one API key vs a pool of keys.
+
+Starts one mock Anthropic server per key (mock_claude_server.py), each
+answering 429 beyond --per-key-concurrency requests in progress, which
+emulates a key's rate limit. It then runs --calls activity executions,
+--concurrency at a time, through the real activity (client pool, failover
+and ejection included) and reports throughput, failed attempts and how the
+calls spread over the keys. A failed attempt is retried after 1 second, as
+the workflows' retry policy would, up to 3 attempts.
+
+Usage:
+    python benchmarks/bench_client_pool.py --keys 1 3 --calls 200 --concurrency 24
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Measure the key pool alone, without the per-tenant limit
+os.environ["TENANT_MAX_CONCURRENT_CALLS"] = "0"
+
+from temporalio.testing import ActivityEnvironment  # noqa: E402
+
+import activities  # noqa: E402
+import claude_pool  # noqa: E402
+from mock_claude_server import MockConfig, start_mock_server  # noqa: E402
+from shared_models import ClaudePromptInput  # noqa: E402
+
+
+async def run_calls(calls: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    failed_attempts = 0
+    failed_calls = 0
+
+    async def one_call(i: int) -> None:
+        nonlocal failed_attempts, failed_calls
+        async with semaphore:
+            for attempt in range(3):
+                try:
+                    await ActivityEnvironment().run(
+                        activities.get_claude_response, ClaudePromptInput(prompt=f"prompt {i}", max_tokens=50)
+                    )
+                    return
+                except Exception:
+                    failed_attempts += 1
+                    await asyncio.sleep(1)
+            failed_calls += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "failed_attempts": failed_attempts, "failed_calls": failed_calls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, nargs="+", default=[1, 3], help="pool sizes to compare")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=24)
+    parser.add_argument("--per-key-concurrency", type=int, default=8)
+    parser.add_argument("--ttft-ms", type=float, default=100.0)
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    args = parser.parse_args()
+    # The activity logs every failover and failure
+    logging.disable(logging.CRITICAL)
+
+    print(f"{args.calls} calls, {args.concurrency} at a time, {args.per_key_concurrency} concurrent calls allowed per key")
+    for keys in args.keys:
+        mocks = [
+            start_mock_server(MockConfig(
+                ttft_ms=args.ttft_ms,
+                tokens_per_second=args.tokens_per_second,
+                output_tokens=50,
+                max_concurrent=args.per_key_concurrency,
+            ))
+            for _ in range(keys)
+        ]
+        os.environ["ANTHROPIC_ENDPOINTS"] = json.dumps([
+            {"name": f"key-{n}", "api_key": "mock", "base_url": f"http://127.0.0.1:{server.server_address[1]}"}
+            for n, (server, _) in enumerate(mocks)
+        ])
+        # Build a fresh pool from the new endpoints
+        claude_pool._pool = None
+        try:
+            result = asyncio.run(run_calls(args.calls, args.concurrency))
+        finally:
+            for server, _ in mocks:
+                server.shutdown()
+
+        spread = ", ".join(
+            f"key-{n}: {stats.requests - sum(stats.errors.values())} ok / {stats.errors.get(429, 0)} x 429"
+            for n, (_, stats) in enumerate(mocks)
+        )
+        print(f"{keys} key(s): {args.calls / result['elapsed']:6.1f} calls/s, "
+              f"{result['failed_attempts']} failed attempts, {result['failed_calls']} failed calls")
+        print(f"    {spread}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Encode/decode microbenchmark for the Temporal payload converters.
+
+Compares the SDK's default data converter (stdlib json, dataclasses.asdict
+and value_to_type reflection) with converter.fast_data_converter on the
+payloads a long conversation produces:
+  - prompt:   ClaudePromptInput carrying a full N-turn conversation_history
+  - response: ClaudeResponse for one turn
+  - history:  the List[Dict] get_conversation_history query result
+
+Every payload is also decoded by the other converter to check that both
+stay wire-compatible.
+
+Usage:
+    python benchmarks/bench_converter.py --turns 100 --message-chars 800
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from temporalio.converter import DataConverter  # noqa: E402
+
+from converter import fast_data_converter  # noqa: E402
+from shared_models import ClaudePromptInput, ClaudeResponse  # noqa: E402
+
+
+def build_payloads(turns: int, message_chars: int):
+    """Values (and their type hints) for a conversation of `turns` turns."""
+    history = []
+    for t in range(turns):
+        history.append({"role": "user", "content": f"[{t}] " + "u" * message_chars})
+        history.append({"role": "assistant", "content": f"[{t}] " + "a" * message_chars})
+    query_result = [
+        {"index": i, "role": m["role"], "content": m["content"], "timestamp": 1.7e9 + i, "truncated": False}
+        for i, m in enumerate(history)
+    ]
+    return {
+        "prompt": (ClaudePromptInput(prompt="next", conversation_history=history), ClaudePromptInput),
+        "response": (
+            ClaudeResponse(
+                text="a" * message_chars,
+                request_id="msg_0123456789abcdef",
+                input_tokens=turns * message_chars // 2,
+                output_tokens=message_chars // 4,
+                stop_reason="end_turn",
+                latency_ms=1234.5,
+            ),
+            ClaudeResponse,
+        ),
+        "history": (query_result, List[Dict]),
+    }
+
+
+def per_op_us(fn, iterations: int) -> float:
+    """Best of three runs of `iterations` calls, in microseconds per call."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+async def check_compatible(value, hint) -> None:
+    default = DataConverter.default
+    for encoder, decoder in ((default, fast_data_converter), (fast_data_converter, default)):
+        decoded = (await decoder.decode(await encoder.encode([value]), [hint]))[0]
+        if decoded != value:
+            raise SystemExit(f"Converters disagree on {type(value).__name__}: {decoded!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--message-chars", type=int, default=800)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.turns, args.message_chars)
+    converters = {
+        "default": DataConverter.default.payload_converter,
+        "fast": fast_data_converter.payload_converter,
+    }
+
+    print(f"{args.turns} turns, {args.message_chars} chars per message")
+    print(f"{'payload':<10} {'KiB':>7} {'converter':<9} {'encode us':>10} {'decode us':>10}")
+    for name, (value, hint) in payloads.items():
+        asyncio.run(check_compatible(value, hint))
+        results = {}
+        for label, converter in converters.items():
+            payload = converter.to_payloads([value])
+            encode = per_op_us(lambda: converter.to_payloads([value]), args.iterations)
+            decode = per_op_us(lambda: converter.from_payloads(payload, [hint]), args.iterations)
+            results[label] = (encode, decode)
+            size = len(payload[0].data) / 1024
+            print(f"{name:<10} {size:>7.1f} {label:<9} {encode:>10.1f} {decode:>10.1f}")
+        (default_encode, default_decode), (fast_encode, fast_decode) = results["default"], results["fast"]
+        print(f"{'':<10} {'':>7} {'speedup':<9} {default_encode / fast_encode:>9.1f}x {default_decode / fast_decode:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Memory benchmark for in-workflow chat message storage.
+
+Simulates the message lists held by N sticky-cached ClaudeChatWorkflow
+instances and reports the memory they use (via tracemalloc) for:
+  - legacy:    the old plain (non-slotted) ChatMessage dataclass
+  - slotted:   the current slotted ChatMessage
+  - truncated: slotted, with a context window so older messages keep
+               only a preview in memory
+
+Usage:
+    python benchmarks/bench_message_memory.py --workflows 10000 --turns 20
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from shared_models import ChatMessage  # noqa: E402
+from workflows import ClaudeChatWorkflow  # noqa: E402
+
+
+@dataclass
+class LegacyChatMessage:
+    role: str
+    content: str
+    timestamp: float
+
+
+def build(message_cls, workflows, turns, user_chars, assistant_chars, context_window=None):
+    """Build the message lists of `workflows` conversations with `turns` turns each."""
+    conversations = []
+    for w in range(workflows):
+        state = SimpleNamespace(messages=[], context_window_messages=context_window)
+        for t in range(turns):
+            # Distinct strings per message, as real content would be
+            state.messages.append(message_cls("user", f"{w}:{t}:" + "u" * user_chars, float(t)))
+            state.messages.append(message_cls("assistant", f"{w}:{t}:" + "a" * assistant_chars, float(t)))
+            if context_window is not None:
+                ClaudeChatWorkflow._truncate_old_messages(state)
+        conversations.append(state)
+    return conversations
+
+
+def measure(label, *args, **kwargs):
+    gc.collect()
+    tracemalloc.start()
+    conversations = build(*args, **kwargs)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    workflows = len(conversations)
+    print(f"{label:<10} {current / 1024 / 1024:10.1f} MiB  {current / workflows / 1024:8.1f} KiB/workflow")
+    del conversations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflows", type=int, default=10_000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--user-chars", type=int, default=200)
+    parser.add_argument("--assistant-chars", type=int, default=1500)
+    parser.add_argument("--context-window", type=int, default=10, help="messages kept in full for 'truncated'")
+    args = parser.parse_args()
+
+    sizes = (args.workflows, args.turns, args.user_chars, args.assistant_chars)
+    print(f"{args.workflows} workflows x {args.turns} turns "
+          f"({args.user_chars}/{args.assistant_chars} chars per user/assistant message)")
+    measure("legacy", LegacyChatMessage, *sizes)
+    measure("slotted", ChatMessage, *sizes)
+    measure("truncated", ChatMessage, *sizes, context_window=args.context_window)
+
+
+if __name__ == "__main__":
+    main()
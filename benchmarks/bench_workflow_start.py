@@ -0,0 +1,130 @@
+"""
+Workflow-start cost benchmark for ClaudeChatWorkflow.
+
+Every new workflow run builds a fresh sandbox: workflows.py and every module
+it imports that isn't passed through are imported again. This replays
+synthetic histories of just the first workflow task (workflow started with
+a ClaudePromptInput), so no Temporal server is needed. It reports the time
+and the peak Python memory of one workflow start for:
+  - default:     SandboxedWorkflowRunner with the SDK's default restrictions
+  - worker:      the runner worker.py uses (explicit pass-through modules)
+  - unsandboxed: UnsandboxedWorkflowRunner, the lower bound
+
+Usage:
+    python benchmarks/bench_workflow_start.py --workflows 500
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from google.protobuf.timestamp_pb2 import Timestamp  # noqa: E402
+from temporalio.api.common.v1 import Payloads, WorkflowType  # noqa: E402
+from temporalio.api.enums.v1 import EventType  # noqa: E402
+from temporalio.api.history.v1 import (  # noqa: E402
+    HistoryEvent,
+    WorkflowExecutionStartedEventAttributes,
+    WorkflowTaskScheduledEventAttributes,
+    WorkflowTaskStartedEventAttributes,
+)
+from temporalio.api.taskqueue.v1 import TaskQueue  # noqa: E402
+from temporalio.client import WorkflowHistory  # noqa: E402
+from temporalio.worker import Replayer, UnsandboxedWorkflowRunner  # noqa: E402
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner  # noqa: E402
+
+from converter import get_data_converter  # noqa: E402
+from shared_models import ClaudePromptInput  # noqa: E402
+from workflows import ClaudeChatWorkflow  # noqa: E402
+from worker import create_workflow_runner  # noqa: E402
+
+
+def start_history(data_converter) -> WorkflowHistory:
+    """History of a chat workflow that was started and picked up its first workflow task."""
+    workflow_id = f"claude-chat-{uuid.uuid4()}"
+    run_id = str(uuid.uuid4())
+    now = Timestamp()
+    now.GetCurrentTime()
+    task_queue = TaskQueue(name="claude-queue")
+    return WorkflowHistory(workflow_id, [
+        HistoryEvent(
+            event_id=1,
+            event_time=now,
+            event_type=EventType.EVENT_TYPE_WORKFLOW_EXECUTION_STARTED,
+            workflow_execution_started_event_attributes=WorkflowExecutionStartedEventAttributes(
+                workflow_type=WorkflowType(name="ClaudeChatWorkflow"),
+                task_queue=task_queue,
+                input=Payloads(payloads=data_converter.payload_converter.to_payloads([ClaudePromptInput(prompt="")])),
+                original_execution_run_id=run_id,
+                first_execution_run_id=run_id,
+                attempt=1,
+            ),
+        ),
+        HistoryEvent(
+            event_id=2,
+            event_time=now,
+            event_type=EventType.EVENT_TYPE_WORKFLOW_TASK_SCHEDULED,
+            workflow_task_scheduled_event_attributes=WorkflowTaskScheduledEventAttributes(task_queue=task_queue),
+        ),
+        HistoryEvent(
+            event_id=3,
+            event_time=now,
+            event_type=EventType.EVENT_TYPE_WORKFLOW_TASK_STARTED,
+            workflow_task_started_event_attributes=WorkflowTaskStartedEventAttributes(scheduled_event_id=2),
+        ),
+    ])
+
+
+async def measure(label: str, runner, workflows: int) -> None:
+    data_converter = get_data_converter()
+    replayer = Replayer(workflows=[ClaudeChatWorkflow], workflow_runner=runner, data_converter=data_converter)
+    # Warm up: the first run pays one-off costs (e.g. validating the workflow)
+    await replayer.replay_workflow(start_history(data_converter))
+
+    histories = [start_history(data_converter) for _ in range(workflows)]
+
+    async def history_iterator():
+        for history in histories:
+            yield history
+
+    gc.collect()
+    start = time.perf_counter()
+    results = await replayer.replay_workflows(history_iterator(), raise_on_replay_failure=False)
+    elapsed = time.perf_counter() - start
+    if results.replay_failures:
+        run_id, failure = next(iter(results.replay_failures.items()))
+        raise SystemExit(f"{label}: replay of {run_id} failed: {failure}")
+
+    # Memory of one start, measured separately to keep tracemalloc out of the
+    # timing. Collect first: discarded sandboxes are cyclic garbage.
+    gc.collect()
+    tracemalloc.start()
+    await replayer.replay_workflow(start_history(data_converter))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {elapsed / workflows * 1000:8.2f} ms/workflow {peak / 1024:10.1f} KiB peak/workflow")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workflows", type=int, default=500)
+    args = parser.parse_args()
+    # Keep the claim-check codec's blob store and index out of the repo
+    workdir = tempfile.mkdtemp(prefix="claude-bench-")
+    os.environ.setdefault("BLOB_STORE_PATH", os.path.join(workdir, "blobs"))
+    os.environ.setdefault("BLOB_REFS_DB_PATH", os.path.join(workdir, "blob_refs.db"))
+
+    print(f"{args.workflows} workflow starts")
+    asyncio.run(measure("default", SandboxedWorkflowRunner(), args.workflows))
+    asyncio.run(measure("worker", create_workflow_runner(), args.workflows))
+    asyncio.run(measure("unsandboxed", UnsandboxedWorkflowRunner(), args.workflows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+End-to-end load test: mock Claude API + Temporal + worker + Flask gateway.
+
+Starts the mock Anthropic server (mock_claude_server.py), a local Temporal dev
+server (or uses --temporal-address), the worker and the gateway as
+subprocesses. It then drives N concurrent conversations of M turns each
+through the HTTP API and reports:
+  - throughput and p50/p95/p99 latency per route
+  - time to first token (from the worker's claude_time_to_first_token metric)
+  - worker and gateway CPU time and peak RSS
+
+Usage:
+    python benchmarks/load_test.py --conversations 50 --turns 5
+    python benchmarks/load_test.py --temporal-address localhost:7233 --rate-429 0.05 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from mock_claude_server import MockConfig, start_mock_server  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def http(method: str, url: str, body: Optional[Dict] = None, timeout: float = 120) -> Tuple[int, Dict]:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={"content-type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def wait_for_http(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+
+def process_stats(pid: int) -> Dict[str, float]:
+    """CPU seconds and peak RSS of a process, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        return {
+            "cpu_seconds": cpu,
+            "rss_mib": int(status["VmRSS"].split()[0]) / 1024,
+            "peak_rss_mib": int(status["VmHWM"].split()[0]) / 1024,
+        }
+    except (OSError, KeyError, IndexError, ValueError):
+        return {}
+
+
+def histogram_percentiles(metrics_text: str, name: str, percentiles=(50, 95, 99)) -> Dict[str, float]:
+    """Approximate percentiles (bucket upper bounds) of a Prometheus histogram, summed over labels."""
+    buckets: Dict[float, float] = {}
+    for line in metrics_text.splitlines():
+        if not line.startswith(f"{name}_bucket{{"):
+            continue
+        labels, value = line.rsplit(" ", 1)
+        le = labels.split('le="', 1)[1].split('"', 1)[0]
+        bound = float("inf") if le == "+Inf" else float(le)
+        buckets[bound] = buckets.get(bound, 0) + float(value)
+    if not buckets or buckets.get(float("inf"), 0) == 0:
+        return {}
+    total = buckets[float("inf")]
+    result = {"count": total}
+    for p in percentiles:
+        result[f"p{p}"] = next(bound for bound in sorted(buckets) if buckets[bound] >= p / 100 * total)
+    return result
+
+
+class LoadDriver:
+    """Runs conversations against the gateway and records per-route latencies."""
+
+    def __init__(self, gateway_url: str, turns: int, prompt_chars: int):
+        self.gateway_url = gateway_url
+        self.turns = turns
+        self.prompt = "Benchmark prompt. " * max(1, prompt_chars // 18)
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def _timed(self, route: str, method: str, path: str, body: Optional[Dict] = None) -> Optional[Dict]:
+        start = time.monotonic()
+        status, result = http(method, self.gateway_url + path, body)
+        elapsed_ms = (time.monotonic() - start) * 1000
+        ok = status == 200 and "error" not in result
+        with self.lock:
+            self.latencies.setdefault(route, []).append(elapsed_ms)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return result if ok else None
+
+    def conversation(self, n: int) -> None:
+        conversation_id = None
+        for turn in range(self.turns):
+            body = {"prompt": f"[{n}.{turn}] {self.prompt}", "requestId": f"bench-{os.getpid()}-{n}-{turn}"}
+            if conversation_id:
+                body["conversationId"] = conversation_id
+            route = "POST /api/chat (continue)" if conversation_id else "POST /api/chat (new)"
+            result = self._timed(route, "POST", "/api/chat", body)
+            if result is None:
+                return
+            conversation_id = result["conversationId"]
+        self._timed("GET /api/history", "GET", f"/api/history/{conversation_id}")
+        self._timed("POST /api/end-conversation", "POST", f"/api/end-conversation/{conversation_id}")
+
+
+async def run(args) -> Dict:
+    mock, mock_stats = start_mock_server(MockConfig(
+        ttft_ms=args.ttft_ms,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        rate_429=args.rate_429,
+        rate_529=args.rate_529,
+    ))
+
+    env = None
+    temporal_address = args.temporal_address
+    if not temporal_address:
+        from temporalio.testing import WorkflowEnvironment
+        from shared_models import (
+            CLAUDE_MODEL_ATTR, CLAUDE_TURN_COUNT_ATTR, CLAUDE_LAST_ACTIVITY_ATTR, CLAUDE_STATUS_ATTR,
+        )
+        env = await WorkflowEnvironment.start_local(search_attributes=[
+            CLAUDE_MODEL_ATTR, CLAUDE_TURN_COUNT_ATTR, CLAUDE_LAST_ACTIVITY_ATTR, CLAUDE_STATUS_ATTR,
+        ])
+        temporal_address = env.client.service_client.config.target_host
+
+    workdir = tempfile.mkdtemp(prefix="claude-bench-")
+    gateway_port, worker_metrics_port, gateway_metrics_port = free_port(), free_port(), free_port()
+    child_env = dict(
+        os.environ,
+        TEMPORAL_ADDRESS=temporal_address,
+        ANTHROPIC_BASE_URL=f"http://127.0.0.1:{mock.server_address[1]}",
+        ANTHROPIC_API_KEY="mock",
+        HISTORY_DB_PATH=os.path.join(workdir, "chat_history.db"),
+        BLOB_STORE_PATH=os.path.join(workdir, "blobs"),
+        BLOB_REFS_DB_PATH=os.path.join(workdir, "blob_refs.db"),
+        WORKER_METRICS_ADDRESS=f"127.0.0.1:{worker_metrics_port}",
+        GATEWAY_METRICS_ADDRESS=f"127.0.0.1:{gateway_metrics_port}",
+    )
+    log = open(os.path.join(workdir, "processes.log"), "w")
+    worker = subprocess.Popen([sys.executable, "worker.py"], cwd=REPO_ROOT, env=child_env, stdout=log, stderr=log)
+    gateway = subprocess.Popen(
+        [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(gateway_port), "--no-reload"],
+        cwd=REPO_ROOT, env=child_env, stdout=log, stderr=log,
+    )
+    gateway_url = f"http://127.0.0.1:{gateway_port}"
+
+    try:
+        await asyncio.to_thread(wait_for_http, f"http://127.0.0.1:{worker_metrics_port}/metrics")
+        await asyncio.to_thread(wait_for_http, gateway_url + "/")
+        start_worker = process_stats(worker.pid)
+        start_gateway = process_stats(gateway.pid)
+
+        driver = LoadDriver(gateway_url, args.turns, args.prompt_chars)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency or args.conversations) as pool:
+            await asyncio.gather(*[
+                asyncio.wrap_future(pool.submit(driver.conversation, n)) for n in range(args.conversations)
+            ])
+        elapsed = time.monotonic() - started
+
+        end_worker = process_stats(worker.pid)
+        end_gateway = process_stats(gateway.pid)
+        worker_metrics = urllib.request.urlopen(f"http://127.0.0.1:{worker_metrics_port}/metrics").read().decode()
+    finally:
+        for proc in (gateway, worker):
+            proc.terminate()
+        for proc in (gateway, worker):
+            proc.wait(timeout=30)
+        log.close()
+        if env is not None:
+            await env.shutdown()
+        mock.shutdown()
+
+    turns = sum(len(v) for k, v in driver.latencies.items() if k.startswith("POST /api/chat"))
+    return {
+        "config": vars(args),
+        "elapsed_seconds": elapsed,
+        "turns_per_second": turns / elapsed if elapsed else 0.0,
+        "routes": {
+            route: {
+                "requests": len(values),
+                "errors": driver.errors.get(route, 0),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+            }
+            for route, values in sorted(driver.latencies.items())
+        },
+        "time_to_first_token_ms": histogram_percentiles(worker_metrics, "claude_time_to_first_token"),
+        "mock": {"requests": mock_stats.requests, "errors": mock_stats.errors},
+        "worker": {
+            "cpu_seconds": end_worker.get("cpu_seconds", 0) - start_worker.get("cpu_seconds", 0),
+            "peak_rss_mib": end_worker.get("peak_rss_mib"),
+        },
+        "gateway": {
+            "cpu_seconds": end_gateway.get("cpu_seconds", 0) - start_gateway.get("cpu_seconds", 0),
+            "peak_rss_mib": end_gateway.get("peak_rss_mib"),
+        },
+        "logs": os.path.join(workdir, "processes.log"),
+    }
+
+
+def print_report(result: Dict) -> None:
+    config = result["config"]
+    print(f"{config['conversations']} conversations x {config['turns']} turns in {result['elapsed_seconds']:.1f}s "
+          f"({result['turns_per_second']:.1f} turns/s)")
+    print(f"{'route':<30} {'requests':>8} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in result["routes"].items():
+        print(f"{route:<30} {stats['requests']:>8} {stats['errors']:>6} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    ttft = result["time_to_first_token_ms"]
+    if ttft:
+        print(f"time to first token (bucketed): p50<={ttft['p50']:.0f}ms p95<={ttft['p95']:.0f}ms "
+              f"p99<={ttft['p99']:.0f}ms over {ttft['count']:.0f} calls")
+    print(f"mock Claude API: {result['mock']['requests']} requests, injected errors {result['mock']['errors']}")
+    for name in ("worker", "gateway"):
+        stats = result[name]
+        print(f"{name}: {stats['cpu_seconds']:.2f} CPU s, peak RSS {stats['peak_rss_mib'] or 0:.0f} MiB")
+    print(f"process logs: {result['logs']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=0, help="concurrent conversations (default: all)")
+    parser.add_argument("--prompt-chars", type=int, default=200)
+    parser.add_argument("--temporal-address", help="use this Temporal server instead of starting a dev server")
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--ttft-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--output-tokens", type=int, default=150)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-529", type=float, default=0.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
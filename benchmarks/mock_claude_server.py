@@ -0,0 +1,231 @@
+"""
+Local mock of the Anthropic Messages API for benchmarks.
+
+Serves POST /v1/messages, both plain JSON and streaming (SSE), and
+POST /v1/messages/count_tokens, with a
+configurable latency distribution and injected 429 (rate limit) and 529
+(overloaded) errors. --max-concurrent emulates one API key's rate limit by
+answering 429 to requests beyond that many in progress. Point the worker at it with
+ANTHROPIC_BASE_URL=http://127.0.0.1:<port> and any ANTHROPIC_API_KEY.
+
+Usage:
+    python benchmarks/mock_claude_server.py --port 8787 --ttft-ms 300 --tokens-per-second 80 --rate-429 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+@dataclass
+class MockConfig:
+    ttft_ms: float = 300.0  # median time to first token
+    ttft_sigma: float = 0.5  # lognormal sigma of time to first token
+    tokens_per_second: float = 80.0  # output speed after the first token
+    output_tokens: int = 150  # tokens per reply (capped by max_tokens)
+    rate_429: float = 0.0  # fraction of requests answered with 429 rate_limit_error
+    rate_529: float = 0.0  # fraction of requests answered with 529 overloaded_error
+    retry_after_seconds: int = 1
+    max_concurrent: int = 0  # requests in progress before answering 429 (0: no limit)
+
+
+class MockStats:
+    """Counters the benchmark reads after a run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors: Dict[int, int] = {}
+
+    def record(self, status: int) -> None:
+        with self._lock:
+            self.requests += 1
+            if status != 200:
+                self.errors[status] = self.errors.get(status, 0) + 1
+
+
+def _estimate_input_tokens(messages: List[Dict]) -> int:
+    # Roughly four characters per token
+    return max(1, sum(len(json.dumps(m.get("content", ""))) for m in messages) // 4)
+
+
+def make_handler(config: MockConfig, stats: MockStats):
+    in_progress = [0]
+    in_progress_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            # Keep benchmark output readable
+            pass
+
+        def _send_json(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            self.send_header("request-id", f"req_{uuid.uuid4().hex}")
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, status: int, error_type: str, message: str) -> None:
+            stats.record(status)
+            self._send_json(
+                status,
+                {"type": "error", "error": {"type": error_type, "message": message}},
+                {"retry-after": str(config.retry_after_seconds)},
+            )
+
+        def do_POST(self):
+            if self.path.split("?")[0] == "/v1/messages/count_tokens":
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                self._send_json(200, {"input_tokens": _estimate_input_tokens(body.get("messages", []))})
+                return
+            if self.path.split("?")[0] != "/v1/messages":
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                return
+
+            body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+
+            with in_progress_lock:
+                over_limit = config.max_concurrent > 0 and in_progress[0] >= config.max_concurrent
+                if not over_limit:
+                    in_progress[0] += 1
+            if over_limit:
+                self._send_error(429, "rate_limit_error", "Mock concurrency limit")
+                return
+            try:
+                self._respond(body)
+            finally:
+                with in_progress_lock:
+                    in_progress[0] -= 1
+
+        def _respond(self, body: Dict) -> None:
+            roll = random.random()
+            if roll < config.rate_429:
+                self._send_error(429, "rate_limit_error", "Mock rate limit")
+                return
+            if roll < config.rate_429 + config.rate_529:
+                self._send_error(529, "overloaded_error", "Mock overload")
+                return
+
+            model = body.get("model", "mock-model")
+            input_tokens = _estimate_input_tokens(body.get("messages", []))
+            output_tokens = max(1, min(config.output_tokens, body.get("max_tokens", config.output_tokens)))
+            words = [f"word{i}" for i in range(output_tokens)]
+            message_id = f"msg_{uuid.uuid4().hex}"
+
+            time.sleep(random.lognormvariate(0, config.ttft_sigma) * config.ttft_ms / 1000)
+            token_delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+            stats.record(200)
+            if not body.get("stream"):
+                time.sleep(token_delay * output_tokens)
+                self._send_json(200, {
+                    "id": message_id,
+                    "type": "message",
+                    "role": "assistant",
+                    "model": model,
+                    "content": [{"type": "text", "text": " ".join(words)}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("cache-control", "no-cache")
+            self.send_header("connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def event(name: str, data: Dict) -> None:
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode())
+                self.wfile.flush()
+
+            event("message_start", {"type": "message_start", "message": {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+            }})
+            event("content_block_start", {
+                "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+            })
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(token_delay)
+                event("content_block_delta", {
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": word if i == 0 else " " + word},
+                })
+            event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            event("message_delta", {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": output_tokens},
+            })
+            event("message_stop", {"type": "message_stop"})
+
+    return Handler
+
+
+def start_mock_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0):
+    """
+    Start the mock server on a background thread.
+    Returns:
+        (server, stats); server.server_address holds the bound port
+    """
+    stats = MockStats()
+    server = ThreadingHTTPServer((host, port), make_handler(config, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--ttft-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--output-tokens", type=int, default=150)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-529", type=float, default=0.0)
+    parser.add_argument("--max-concurrent", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        ttft_ms=args.ttft_ms,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        rate_429=args.rate_429,
+        rate_529=args.rate_529,
+        max_concurrent=args.max_concurrent,
+    )
+    server, _ = start_mock_server(config, args.host, args.port)
+    print(f"Mock Claude API listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
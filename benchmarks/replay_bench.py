@@ -0,0 +1,214 @@
+"""
+Replay performance and determinism regression suite for ClaudeChatWorkflow.
+
+record: runs long conversations on a local Temporal dev server, with fake
+        Claude activities that return large replies, and saves each
+        workflow's event history as JSON.
+replay: replays every saved history with temporalio.worker.Replayer and
+        reports replay time per event and peak Python memory. It exits
+        non-zero on a replay failure (e.g. non-determinism), or if a
+        history replays more than --max-regression slower per event than
+        in --baseline.
+
+Usage:
+    python benchmarks/replay_bench.py record --turns 300 --message-chars 4000
+    python benchmarks/replay_bench.py replay --update-baseline
+    python benchmarks/replay_bench.py replay            # after changing workflows.py
+
+Baselines are machine-specific; record one on the machine that runs the check.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from temporalio import activity  # noqa: E402
+from temporalio.client import WorkflowHistory, WithStartWorkflowOperation  # noqa: E402
+from temporalio.common import WorkflowIDConflictPolicy  # noqa: E402
+from temporalio.worker import Replayer, Worker  # noqa: E402
+
+from shared_models import (  # noqa: E402
+    ClaudePromptInput,
+    ClaudeResponse,
+    ProjectMessagesInput,
+    CLAUDE_MODEL_ATTR,
+    CLAUDE_TURN_COUNT_ATTR,
+    CLAUDE_LAST_ACTIVITY_ATTR,
+    CLAUDE_STATUS_ATTR,
+)
+from workflows import ClaudeChatWorkflow, ClaudeBatchWorkflow  # noqa: E402
+from converter import get_data_converter  # noqa: E402
+from worker import create_workflow_runner  # noqa: E402
+
+HISTORY_DIR = os.path.join(os.path.dirname(__file__), "histories")
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "replay_baseline.json")
+
+
+def fake_activities(message_chars: int):
+    """Stand-ins for the real activities, registered under the same names."""
+
+    @activity.defn(name="get_claude_response")
+    async def get_claude_response(input: ClaudePromptInput) -> ClaudeResponse:
+        turn = len(input.conversation_history or [])
+        return ClaudeResponse(
+            text=f"[reply {turn}] " + "x" * message_chars,
+            request_id=f"msg_{uuid.uuid4().hex}",
+            input_tokens=sum(len(m["content"]) for m in input.conversation_history or []) // 4,
+            output_tokens=message_chars // 4,
+            stop_reason="end_turn",
+        )
+
+    @activity.defn(name="project_messages")
+    async def project_messages(input: ProjectMessagesInput) -> None:
+        pass
+
+    return [get_claude_response, project_messages]
+
+
+async def record(args) -> None:
+    from temporalio.testing import WorkflowEnvironment
+
+    os.makedirs(args.history_dir, exist_ok=True)
+    async with await WorkflowEnvironment.start_local(search_attributes=[
+        CLAUDE_MODEL_ATTR, CLAUDE_TURN_COUNT_ATTR, CLAUDE_LAST_ACTIVITY_ATTR, CLAUDE_STATUS_ATTR,
+    ], data_converter=get_data_converter()) as env:
+        task_queue = f"replay-bench-{uuid.uuid4().hex}"
+        async with Worker(
+            env.client,
+            task_queue=task_queue,
+            workflows=[ClaudeChatWorkflow, ClaudeBatchWorkflow],
+            activities=fake_activities(args.message_chars),
+            workflow_runner=create_workflow_runner(),
+        ):
+            for n in range(args.conversations):
+                workflow_id = f"replay-bench-{args.turns}x{args.message_chars}-{n}"
+                settings = ClaudePromptInput(
+                    prompt="", context_window_messages=args.context_window or None
+                )
+                user_message = "u" * args.message_chars
+                await env.client.execute_update_with_start_workflow(
+                    ClaudeChatWorkflow.chat,
+                    f"[turn 0] {user_message}",
+                    start_workflow_operation=WithStartWorkflowOperation(
+                        ClaudeChatWorkflow.run,
+                        settings,
+                        id=workflow_id,
+                        task_queue=task_queue,
+                        id_conflict_policy=WorkflowIDConflictPolicy.FAIL,
+                    ),
+                )
+                handle = env.client.get_workflow_handle(workflow_id)
+                for turn in range(1, args.turns):
+                    await handle.execute_update(ClaudeChatWorkflow.chat, f"[turn {turn}] {user_message}")
+
+                history = await handle.fetch_history()
+                path = os.path.join(args.history_dir, f"{workflow_id}.json")
+                with open(path, "w") as f:
+                    f.write(history.to_json())
+                print(f"recorded {path} ({len(history.events)} events)")
+                await handle.terminate("replay benchmark recording done")
+
+
+async def replay_one(history: WorkflowHistory) -> Dict:
+    replayer = Replayer(
+        workflows=[ClaudeChatWorkflow, ClaudeBatchWorkflow],
+        workflow_runner=create_workflow_runner(),
+        data_converter=get_data_converter(),
+    )
+
+    # Timing pass, without tracemalloc overhead
+    start = time.perf_counter()
+    result = await replayer.replay_workflow(history, raise_on_replay_failure=False)
+    elapsed = time.perf_counter() - start
+
+    # Memory pass
+    tracemalloc.start()
+    await replayer.replay_workflow(history, raise_on_replay_failure=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    events = len(history.events)
+    return {
+        "events": events,
+        "seconds": elapsed,
+        "us_per_event": elapsed / events * 1e6 if events else 0.0,
+        "peak_mib": peak / 1024 / 1024,
+        "failure": str(result.replay_failure) if result.replay_failure else None,
+    }
+
+
+async def replay(args) -> int:
+    paths = sorted(glob.glob(os.path.join(args.history_dir, "*.json")))
+    if not paths:
+        print(f"No histories in {args.history_dir}; run the 'record' mode first")
+        return 1
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failed = False
+    print(f"{'history':<45} {'events':>7} {'us/event':>9} {'baseline':>9} {'peak MiB':>9}")
+    for path in paths:
+        name = os.path.basename(path)
+        with open(path) as f:
+            history = WorkflowHistory.from_json(os.path.splitext(name)[0], f.read())
+        stats = await replay_one(history)
+        results[name] = stats
+
+        base = baseline.get(name, {}).get("us_per_event")
+        print(f"{name:<45} {stats['events']:>7} {stats['us_per_event']:>9.1f} "
+              f"{base if base is not None else float('nan'):>9.1f} {stats['peak_mib']:>9.1f}")
+        if stats["failure"]:
+            print(f"  REPLAY FAILURE: {stats['failure']}")
+            failed = True
+        elif base is not None and stats["us_per_event"] > base * (1 + args.max_regression):
+            print(f"  REGRESSION: {stats['us_per_event'] / base - 1:+.0%} per event (limit {args.max_regression:+.0%})")
+            failed = True
+
+    if args.update_baseline and not failed:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"wrote baseline {args.baseline}")
+
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--history-dir", default=HISTORY_DIR)
+    parser.add_argument("--conversations", type=int, default=2, help="record: histories to record")
+    parser.add_argument("--turns", type=int, default=300, help="record: turns per conversation")
+    parser.add_argument("--message-chars", type=int, default=4000, help="record: size of each message")
+    # Sending the whole transcript of hundreds of large turns would exceed
+    # Temporal's payload size limit, so record with a context window
+    parser.add_argument("--context-window", type=int, default=40, help="record: context_window_messages (0 = all)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="replay: baseline results to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="replay: save results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="replay: allowed slowdown per event vs. the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+    # Payloads the claim-check codec offloads while recording are read back
+    # when replaying, so keep its blob store with the histories
+    os.environ.setdefault("BLOB_STORE_PATH", os.path.join(args.history_dir, "blobs"))
+    os.environ.setdefault("BLOB_REFS_DB_PATH", os.path.join(args.history_dir, "blob_refs.db"))
+
+    if args.mode == "record":
+        asyncio.run(record(args))
+    else:
+        sys.exit(asyncio.run(replay(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Startup benchmark for the gateway and worker processes.
+
+imports: imports app, worker, workflows and activities in fresh interpreters
+         with `python -X importtime` and reports the median import time of
+         each, plus the slowest imports underneath it. The raw importtime
+         reports are saved to --report-dir.
+worker:  starts worker.py against a Temporal server (a local dev server, or
+         --temporal-address) and measures the time from process start until
+         its first poll shows up in DescribeTaskQueue.
+
+Usage:
+    python benchmarks/startup_bench.py imports --runs 5
+    python benchmarks/startup_bench.py worker --runs 3
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+MODULES = ["app", "worker", "workflows", "activities"]
+REPORT_DIR = os.path.join(os.path.dirname(__file__), "importtime")
+
+
+def import_times(module: str) -> Tuple[Dict[str, int], str]:
+    """
+    Import `module` in a fresh interpreter.
+    Returns:
+        (cumulative microseconds per imported module, raw -X importtime report)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        times[parts[2].strip()] = int(parts[1])
+    return times, result.stderr
+
+
+def run_imports(args) -> None:
+    os.makedirs(args.report_dir, exist_ok=True)
+    for module in MODULES:
+        runs: List[Dict[str, int]] = []
+        for n in range(args.runs):
+            times, report = import_times(module)
+            runs.append(times)
+            with open(os.path.join(args.report_dir, f"{module}-{n}.txt"), "w") as f:
+                f.write(report)
+
+        total = statistics.median(run[module] for run in runs) / 1000
+        print(f"{module}: {total:.0f} ms (median of {args.runs})")
+        # Slowest imports by cumulative time, median across runs
+        medians = {
+            name: statistics.median(run.get(name, 0) for run in runs) / 1000
+            for name in runs[-1] if name != module
+        }
+        for name, ms in sorted(medians.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {ms:7.1f} ms  {name}")
+
+
+async def worker_startup(client, temporal_address: str) -> float:
+    """Seconds from starting worker.py until it polls the claude-queue workflow task queue."""
+    from temporalio.api.enums.v1 import TaskQueueType
+    from temporalio.api.taskqueue.v1 import TaskQueue
+    from temporalio.api.workflowservice.v1 import DescribeTaskQueueRequest
+
+    metrics_port = _free_port()
+    env = dict(
+        os.environ,
+        TEMPORAL_ADDRESS=temporal_address,
+        WORKER_METRICS_ADDRESS=f"127.0.0.1:{metrics_port}",
+    )
+    started = time.monotonic()
+    worker = subprocess.Popen(
+        [sys.executable, "worker.py"], cwd=REPO_ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # The SDK's default worker identity is "<pid>@<hostname>"
+        identity_prefix = f"{worker.pid}@"
+        request = DescribeTaskQueueRequest(
+            namespace=client.namespace,
+            task_queue=TaskQueue(name="claude-queue"),
+            task_queue_type=TaskQueueType.TASK_QUEUE_TYPE_WORKFLOW,
+        )
+        while time.monotonic() - started < 60:
+            response = await client.workflow_service.describe_task_queue(request)
+            if any(p.identity.startswith(identity_prefix) for p in response.pollers):
+                return time.monotonic() - started
+            if worker.poll() is not None:
+                raise RuntimeError(f"worker.py exited with {worker.returncode}")
+            await asyncio.sleep(0.01)
+        raise TimeoutError("worker.py did not poll within 60s")
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_worker(args) -> None:
+    from temporalio.client import Client
+
+    env = None
+    temporal_address = args.temporal_address
+    if not temporal_address:
+        from temporalio.testing import WorkflowEnvironment
+        env = await WorkflowEnvironment.start_local()
+        temporal_address = env.client.service_client.config.target_host
+    try:
+        client = await Client.connect(temporal_address)
+        results = [await worker_startup(client, temporal_address) for _ in range(args.runs)]
+        print(f"worker start to first poll: median {statistics.median(results) * 1000:.0f} ms, "
+              f"min {min(results) * 1000:.0f} ms, max {max(results) * 1000:.0f} ms ({args.runs} runs)")
+    finally:
+        if env is not None:
+            await env.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["imports", "worker"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="imports: slowest imports to list per module")
+    parser.add_argument("--report-dir", default=REPORT_DIR, help="imports: where to save -X importtime reports")
+    parser.add_argument("--temporal-address", help="worker: existing Temporal server (default: start a dev server)")
+    args = parser.parse_args()
+
+    if args.mode == "imports":
+        run_imports(args)
+    else:
+        asyncio.run(run_worker(args))
+
+
+if __name__ == "__main__":
+    main()
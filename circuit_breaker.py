@@ -0,0 +1,167 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that is failing, so calls fail in microseconds
+    instead of tying up a worker slot until they time out.
+
+    Closed: calls go through and their outcomes are kept for window_seconds.
+    Once at least min_calls were made in the window, the breaker opens if
+    the share of failed calls reaches error_rate, or the share of calls
+    slower than slow_call_seconds reaches slow_rate.
+    Open: calls are rejected for open_seconds.
+    Half open: up to half_open_probes calls go through. The first of them to
+    finish closes the breaker if it succeeded in time, and opens it again if
+    not.
+
+    allow() hands out the breaker's generation, which changes with every
+    state change, and record() ignores calls allowed in an earlier one. So
+    only a probe can end the half-open state, and a call that was allowed
+    before the breaker opened can't close it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._generation = 0
+        # (finished at, failed, slow) for calls in the window
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[int]:
+        """
+        Ask to make a call. Every allowed call must be followed by record().
+        Returns:
+            The generation to pass to record(), or None if the call must not
+            be made
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    return None
+                self._transition(HALF_OPEN, now)
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    return None
+                self._probes += 1
+            return self._generation
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def record(self, generation: int, failed: bool, seconds: float) -> None:
+        """
+        Record the outcome of an allowed call.
+        Args:
+            generation: What allow() returned for the call
+            failed: The upstream failed (not: the request was invalid)
+            seconds: How long the call took
+        """
+        now = time.monotonic()
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if generation != self._generation:
+                # Allowed in an earlier state; says nothing about this one
+                return
+            if self.state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                self._transition(OPEN if failed or slow else CLOSED, now)
+                return
+
+            self._calls.append((now, failed, slow))
+            while self._calls and self._calls[0][0] < now - self.window_seconds:
+                self._calls.popleft()
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._calls if f)
+            slow_calls = sum(1 for _, _, s in self._calls if s)
+            if failures >= self.error_rate * len(self._calls) or slow_calls >= self.slow_rate * len(self._calls):
+                logger.warning(
+                    f"Opening circuit {self.name}: {failures} failed and {slow_calls} slow "
+                    f"of {len(self._calls)} calls in {self.window_seconds:.0f}s"
+                )
+                self._transition(OPEN, now)
+
+    def _transition(self, state: str, now: float) -> None:
+        if state == self.state:
+            return
+        logger.info(f"Circuit {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._generation += 1
+        if state == OPEN:
+            self._opened_at = now
+            self._probes = 0
+        elif state == CLOSED:
+            # Start over; failures from before the outage say nothing now
+            self._calls.clear()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Get the worker's circuit breaker for `name` (a Claude model), configured
+    by the CLAUDE_CIRCUIT_* environment variables.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                window_seconds=float(os.environ.get("CLAUDE_CIRCUIT_WINDOW_SECONDS", 60)),
+                min_calls=int(os.environ.get("CLAUDE_CIRCUIT_MIN_CALLS", 10)),
+                error_rate=float(os.environ.get("CLAUDE_CIRCUIT_ERROR_RATE", 0.5)),
+                slow_call_seconds=float(os.environ.get("CLAUDE_CIRCUIT_SLOW_CALL_SECONDS", 20)),
+                slow_rate=float(os.environ.get("CLAUDE_CIRCUIT_SLOW_RATE", 0.8)),
+                open_seconds=float(os.environ.get("CLAUDE_CIRCUIT_OPEN_SECONDS", 30)),
+                half_open_probes=int(os.environ.get("CLAUDE_CIRCUIT_HALF_OPEN_PROBES", 1)),
+            )
+    return breaker
+
+
+def fallback_model(model: str) -> Optional[str]:
+    """
+    The model to use while `model`'s circuit is open, from
+    CLAUDE_FALLBACK_MODELS ("model=fallback,other-model=other-fallback").
+    """
+    for entry in os.environ.get("CLAUDE_FALLBACK_MODELS", "").split(","):
+        primary, _, fallback = entry.partition("=")
+        if primary.strip() == model and fallback.strip():
+            return fallback.strip()
+    return None
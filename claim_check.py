@@ -0,0 +1,458 @@
+import os
+import asyncio
+import logging
+import hashlib
+import time
+import sqlite3
+import threading
+import contextlib
+import contextvars
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Sequence
+
+from temporalio import activity, workflow
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import PayloadCodec
+from temporalio.exceptions import TemporalError
+
+
+# Encoding of the reference payloads left in event history
+CLAIM_CHECK_ENCODING = b"claim-check/sha256"
+# Metadata the payload converter adds so the codec knows which conversation a
+# payload belongs to. The codec strips it before anything is stored.
+OWNER_METADATA_KEY = "claim-check-owner"
+
+logger = logging.getLogger(__name__)
+
+_owner: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("claim_check_owner", default=None)
+
+
+@contextlib.contextmanager
+def payload_owner(owner: str) -> Iterator[None]:
+    """
+    Attribute payloads encoded inside this block to `owner` (a conversation ID).
+    Workflows and activities don't need this; their workflow ID is used.
+    """
+    token = _owner.set(owner)
+    try:
+        yield
+    finally:
+        _owner.reset(token)
+
+
+def current_owner() -> Optional[str]:
+    """
+    Conversation that payloads being encoded right now belong to: the
+    payload_owner() block, else the current activity's or workflow's workflow ID.
+    """
+    owner = _owner.get()
+    if owner is not None:
+        return owner
+    if activity.in_activity():
+        return activity.info().workflow_id
+    try:
+        return workflow.info().workflow_id
+    except (RuntimeError, TemporalError):
+        # Not in a workflow: no event loop, or a non-workflow one
+        return None
+
+
+class BlobStore(ABC):
+    """
+    Content-addressed storage for offloaded payloads. Keys are SHA-256 hex
+    digests of the content. Subclass this to plug in a different backend and
+    register it in BACKENDS.
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        """Store data under key, replacing any existing blob."""
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        """
+        Read a blob.
+        Raises:
+            KeyError: If there's no blob with this key
+        """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether a blob with this key is stored."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete a blob; deleting a missing blob is not an error."""
+
+
+class LocalBlobStore(BlobStore):
+    """BlobStore keeping one file per blob under a local directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # Fan out over 256 subdirectories so no directory gets huge
+        return os.path.join(self.root, key[:2], key)
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial blob
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(key))
+
+
+class S3BlobStore(BlobStore):
+    """
+    BlobStore backed by an S3 bucket, or any S3-compatible service (MinIO,
+    R2, ...) via endpoint_url. Needs boto3 (pip install boto3).
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        import boto3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            raise KeyError(key) from None
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except self.client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+class BlobRefIndex:
+    """
+    SQLite index of which conversations reference which blobs, so a blob
+    shared by several conversations is only deleted once all of them ended.
+    Like the history store, the worker and Flask app must share the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blob_refs (
+                owner TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (owner, key)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS blob_refs_by_key ON blob_refs (key)")
+        # Blobs no conversation references any more, waiting out the grace period
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blob_orphans (
+                key TEXT PRIMARY KEY,
+                orphaned_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; transactions are started explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE takes the write lock up front, so add() and release()
+        # never interleave
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add(self, owner: str, key: str) -> None:
+        """Record that owner references key (again), rescuing it from deletion."""
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO blob_refs (owner, key) VALUES (?, ?)", (owner, key))
+            conn.execute("DELETE FROM blob_orphans WHERE key = ?", (key,))
+
+    @contextlib.contextmanager
+    def release(self, owner: str, grace_seconds: float) -> Iterator[List[str]]:
+        """
+        Drop all of owner's references. Blobs nobody references any more
+        become orphans; orphans older than grace_seconds are yielded for
+        deletion. The caller deletes them before the block exits, while
+        add() is locked out, so a blob can't be revived mid-deletion.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            keys = [row[0] for row in conn.execute("SELECT key FROM blob_refs WHERE owner = ?", (owner,))]
+            conn.execute("DELETE FROM blob_refs WHERE owner = ?", (owner,))
+            for key in keys:
+                if conn.execute("SELECT 1 FROM blob_refs WHERE key = ? LIMIT 1", (key,)).fetchone() is None:
+                    conn.execute("INSERT OR REPLACE INTO blob_orphans (key, orphaned_at) VALUES (?, ?)", (key, now))
+            yield self._take_expired(conn, now - grace_seconds)
+
+    @contextlib.contextmanager
+    def sweep(self, grace_seconds: float) -> Iterator[List[str]]:
+        """
+        Yield orphans older than grace_seconds for deletion, like release()
+        but without dropping any references. Orphans otherwise only expire
+        when a later conversation ends.
+        """
+        with self._transaction() as conn:
+            yield self._take_expired(conn, time.time() - grace_seconds)
+
+    @staticmethod
+    def _take_expired(conn: sqlite3.Connection, orphaned_before: float) -> List[str]:
+        # Forget orphans that have been unreferenced since before
+        # orphaned_before and return their keys
+        expired = [
+            row[0] for row in conn.execute(
+                "SELECT key FROM blob_orphans WHERE orphaned_at <= ?", (orphaned_before,)
+            )
+        ]
+        conn.executemany("DELETE FROM blob_orphans WHERE key = ?", [(key,) for key in expired])
+        return expired
+
+
+class _BlobCache:
+    """Small thread-safe LRU of recently read blobs, bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._blobs.get(key)
+            if data is not None:
+                self._blobs.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._blobs:
+                return
+            self._blobs[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._blobs.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class ClaimCheckCodec(PayloadCodec):
+    """
+    Payload codec implementing the claim-check pattern: payloads larger than
+    `threshold` bytes are written to a BlobStore, and event history only keeps
+    a small reference payload holding the blob's SHA-256. Identical payloads
+    share one blob. References are resolved when the SDK decodes the payload,
+    so blobs are only read by the process that actually needs the value (e.g.
+    the gateway's history reads never touch them), and recently read blobs
+    are cached for replays.
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        refs: BlobRefIndex,
+        threshold: int,
+        cache_bytes: int = 64 * 1024 * 1024,
+        grace_seconds: float = 600,
+    ):
+        self.store = store
+        self.refs = refs
+        self.threshold = threshold
+        self.grace_seconds = grace_seconds
+        self._cache = _BlobCache(cache_bytes)
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        owners = []
+        stripped = []
+        for payload in payloads:
+            owner = ""
+            if OWNER_METADATA_KEY in payload.metadata:
+                owner = payload.metadata[OWNER_METADATA_KEY].decode()
+                payload = Payload(
+                    metadata={k: v for k, v in payload.metadata.items() if k != OWNER_METADATA_KEY},
+                    data=payload.data,
+                )
+            owners.append(owner)
+            stripped.append(payload)
+        if all(p.ByteSize() <= self.threshold for p in stripped):
+            return stripped
+        # Blob store I/O is blocking
+        return await asyncio.to_thread(self._encode, stripped, owners)
+
+    def _encode(self, payloads: List[Payload], owners: List[str]) -> List[Payload]:
+        encoded = []
+        for payload, owner in zip(payloads, owners):
+            if payload.ByteSize() <= self.threshold:
+                encoded.append(payload)
+                continue
+
+            data = payload.SerializeToString(deterministic=True)
+            key = hashlib.sha256(data).hexdigest()
+            # Record the reference before checking for the blob, so a
+            # concurrent release() either sees it or has finished deleting.
+            # Payloads without an owner are referenced by "" and never collected.
+            self.refs.add(owner, key)
+            if not self.store.exists(key):
+                self.store.put(key, data)
+            encoded.append(Payload(metadata={"encoding": CLAIM_CHECK_ENCODING}, data=key.encode()))
+        return encoded
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        if not any(p.metadata.get("encoding") == CLAIM_CHECK_ENCODING for p in payloads):
+            return list(payloads)
+        return await asyncio.to_thread(self._decode, payloads)
+
+    def _decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        decoded = []
+        for payload in payloads:
+            if payload.metadata.get("encoding") != CLAIM_CHECK_ENCODING:
+                decoded.append(payload)
+                continue
+            key = payload.data.decode()
+            data = self._cache.get(key)
+            if data is None:
+                try:
+                    data = self.store.get(key)
+                except KeyError:
+                    raise RuntimeError(f"Claim-check blob {key} not found (garbage-collected or wrong store?)") from None
+                if hashlib.sha256(data).hexdigest() != key:
+                    raise RuntimeError(f"Claim-check blob {key} is corrupt")
+                self._cache.put(key, data)
+            decoded.append(Payload.FromString(data))
+        return decoded
+
+    def release(self, owners: Sequence[str]) -> int:
+        """
+        Garbage-collect the blobs of ended workflows: drop their references
+        and delete blobs nobody has referenced for the grace period. The grace
+        period keeps the blobs of a just-ended workflow around in case its
+        last workflow task has to be replayed (e.g. the worker crashed before
+        completing it), so deletion happens when a later workflow ends or at
+        the next sweep().
+        Args:
+            owners: Workflow IDs whose references to drop
+        Returns:
+            Number of blobs deleted
+        """
+        deleted = 0
+        for owner in owners:
+            with self.refs.release(owner, self.grace_seconds) as expired:
+                for key in expired:
+                    self.store.delete(key)
+            deleted += len(expired)
+        return deleted
+
+    def sweep(self) -> int:
+        """
+        Delete blobs nobody has referenced for the grace period, without
+        waiting for another workflow to end.
+        Returns:
+            Number of blobs deleted
+        """
+        with self.refs.sweep(self.grace_seconds) as expired:
+            for key in expired:
+                self.store.delete(key)
+        return len(expired)
+
+
+async def sweep_orphaned_blobs(codec: ClaimCheckCodec, interval_seconds: float) -> None:
+    """
+    Call codec.sweep() now and then every interval_seconds, until cancelled.
+    A failed sweep is logged and retried at the next interval.
+    """
+    while True:
+        try:
+            # SQLite, file and S3 deletes block; keep them off the event loop
+            deleted = await asyncio.to_thread(codec.sweep)
+            if deleted:
+                logger.info(f"Swept {deleted} orphaned payload blobs")
+        except Exception as e:
+            logger.warning(f"Failed to sweep orphaned payload blobs: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+# Available blob store backends, selected with BLOB_STORE_BACKEND
+BACKENDS = {
+    "local": lambda: LocalBlobStore(os.environ.get("BLOB_STORE_PATH", "blobs")),
+    "s3": lambda: S3BlobStore(
+        os.environ["BLOB_STORE_S3_BUCKET"],
+        prefix=os.environ.get("BLOB_STORE_S3_PREFIX", ""),
+        endpoint_url=os.environ.get("BLOB_STORE_S3_ENDPOINT_URL"),
+    ),
+}
+
+_codec: Optional[ClaimCheckCodec] = None
+_codec_lock = threading.Lock()
+
+
+def get_claim_check_codec() -> Optional[ClaimCheckCodec]:
+    """
+    Get the process-wide claim-check codec.
+    Returns:
+        The codec, or None if BLOB_STORE_BACKEND is "none"
+    """
+    global _codec
+    backend = os.environ.get("BLOB_STORE_BACKEND", "local")
+    if backend == "none":
+        return None
+
+    with _codec_lock:
+        if _codec is None:
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown BLOB_STORE_BACKEND: {backend}")
+            _codec = ClaimCheckCodec(
+                BACKENDS[backend](),
+                BlobRefIndex(os.environ.get("BLOB_REFS_DB_PATH", "blob_refs.db")),
+                threshold=int(os.environ.get("CLAIM_CHECK_THRESHOLD_BYTES", 64 * 1024)),
+                cache_bytes=int(os.environ.get("CLAIM_CHECK_CACHE_BYTES", 64 * 1024 * 1024)),
+                grace_seconds=float(os.environ.get("CLAIM_CHECK_GC_GRACE_SECONDS", 600)),
+            )
+    return _codec
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Collection, Dict, List, Optional
+
+
+class ClaudeEndpoint:
+    """
+    One Anthropic API credential (and optionally base URL) in the pool, with
+    its load-balancing and health state.
+    """
+
+    def __init__(self, name: str, api_key: str, base_url: Optional[str] = None, weight: int = 1):
+        self.name = name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.weight = max(1, weight)
+        # Smooth weighted round-robin state
+        self.current_weight = 0
+        # Health: no new calls until ejected_until (a time.monotonic() value)
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        self._client = None
+
+    def client(self, max_retries: Optional[int] = None) -> Any:
+        """The endpoint's anthropic.AsyncAnthropic client, created on first use and then reused."""
+        if self._client is None:
+            import anthropic
+            self._client = anthropic.AsyncAnthropic(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=anthropic.DEFAULT_MAX_RETRIES if max_retries is None else max_retries,
+            )
+        return self._client
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+
+class ClaudeClientPool:
+    """
+    Spreads Claude calls over several API keys or endpoints, so throughput
+    isn't capped by one key's rate limit.
+
+    Endpoints are picked by smooth weighted round-robin (an endpoint with
+    weight 2 gets every other call of three, not two in a row). One that
+    answers 429, 5xx or not at all is ejected for ejection_seconds, doubling
+    with each consecutive failure up to max_ejection_seconds (and at least as
+    long as its Retry-After), and rejoins after a success.
+    """
+
+    def __init__(self, endpoints: List[ClaudeEndpoint], ejection_seconds: float = 5.0, max_ejection_seconds: float = 120.0):
+        if not endpoints:
+            raise ValueError("The Claude client pool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.ejection_seconds = ejection_seconds
+        self.max_ejection_seconds = max_ejection_seconds
+        self._lock = threading.Lock()
+
+    def client(self, endpoint: ClaudeEndpoint) -> Any:
+        """
+        Get the API client for an endpoint. With several endpoints the SDK's
+        own retries are off: failing over to another endpoint beats retrying
+        one that is rate limited.
+        """
+        return endpoint.client(max_retries=0 if len(self.endpoints) > 1 else None)
+
+    def choose(self, exclude: Collection[str] = ()) -> Optional[ClaudeEndpoint]:
+        """
+        Pick the endpoint for the next call.
+        Args:
+            exclude: Names of endpoints already tried for this call
+        Returns:
+            A healthy endpoint not in `exclude`. If none is healthy, the one
+            that recovers first when nothing was excluded (so calls still go
+            out), else None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.name not in exclude and e.healthy(now)]
+            if not candidates:
+                if exclude:
+                    return None
+                return min(self.endpoints, key=lambda e: e.ejected_until)
+
+            total = 0
+            best = None
+            for endpoint in candidates:
+                endpoint.current_weight += endpoint.weight
+                total += endpoint.weight
+                if best is None or endpoint.current_weight > best.current_weight:
+                    best = endpoint
+            best.current_weight -= total
+            return best
+
+    def report_success(self, endpoint: ClaudeEndpoint) -> None:
+        with self._lock:
+            endpoint.consecutive_failures = 0
+            endpoint.ejected_until = 0.0
+
+    def report_failure(self, endpoint: ClaudeEndpoint, retry_after: Optional[float] = None) -> float:
+        """
+        Eject an endpoint that was rate limited, overloaded or unreachable.
+        Args:
+            endpoint: The failed endpoint
+            retry_after: The response's Retry-After in seconds, if any
+        Returns:
+            Seconds the endpoint is ejected for
+        """
+        with self._lock:
+            endpoint.consecutive_failures += 1
+            seconds = self.ejection_seconds * 2 ** min(endpoint.consecutive_failures - 1, 10)
+            seconds = min(max(seconds, retry_after or 0), self.max_ejection_seconds)
+            endpoint.ejected_until = time.monotonic() + seconds
+        return seconds
+
+    def status(self) -> List[Dict]:
+        """Health of every endpoint, for logs and debugging."""
+        now = time.monotonic()
+        return [
+            {
+                "name": e.name,
+                "weight": e.weight,
+                "healthy": e.healthy(now),
+                "ejected_for_seconds": max(0.0, e.ejected_until - now),
+                "consecutive_failures": e.consecutive_failures,
+            }
+            for e in self.endpoints
+        ]
+
+
+def load_endpoints() -> List[ClaudeEndpoint]:
+    """
+    Read the pool from ANTHROPIC_ENDPOINTS, a JSON list like
+    [{"name": "a", "api_key_env": "ANTHROPIC_API_KEY_A", "weight": 2},
+     {"name": "b", "api_key": "...", "base_url": "https://..."}].
+    Without it the pool is the single ANTHROPIC_API_KEY (and the SDK's
+    ANTHROPIC_BASE_URL).
+    """
+    raw = os.environ.get("ANTHROPIC_ENDPOINTS")
+    if not raw:
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+        return [ClaudeEndpoint("default", api_key)]
+
+    endpoints = []
+    for i, spec in enumerate(json.loads(raw)):
+        name = spec.get("name") or f"endpoint-{i}"
+        api_key = spec.get("api_key") or os.environ.get(spec.get("api_key_env", ""))
+        if not api_key:
+            raise ValueError(f"ANTHROPIC_ENDPOINTS: no API key for {name}")
+        endpoints.append(ClaudeEndpoint(name, api_key, spec.get("base_url"), int(spec.get("weight", 1))))
+    return endpoints
+
+
+_pool: Optional[ClaudeClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_claude_pool() -> ClaudeClientPool:
+    """
+    Get the worker's Claude client pool, configured by ANTHROPIC_ENDPOINTS
+    (or ANTHROPIC_API_KEY), CLAUDE_EJECTION_SECONDS and CLAUDE_MAX_EJECTION_SECONDS.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ClaudeClientPool(
+                load_endpoints(),
+                ejection_seconds=float(os.environ.get("CLAUDE_EJECTION_SECONDS", 5)),
+                max_ejection_seconds=float(os.environ.get("CLAUDE_MAX_EJECTION_SECONDS", 120)),
+            )
+    return _pool
@@ -0,0 +1,152 @@
+import os
+import dataclasses
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+import pydantic_core
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import (
+    CompositePayloadConverter,
+    DataConverter,
+    DefaultPayloadConverter,
+    JSONPlainPayloadConverter,
+    value_to_type,
+)
+
+from claim_check import OWNER_METADATA_KEY, current_owner, get_claim_check_codec
+from shared_models import (
+    ClaudePromptInput,
+    ClaudeResponse,
+    ClaudeBatchInput,
+    ClaudeBatchItem,
+    ClaudeBatchResult,
+    ProjectMessagesInput,
+    TokenUsage,
+)
+
+# Types decoded with a prebuilt pydantic-core schema instead of
+# value_to_type() reflection: the shared dataclasses, plus the history lists
+# and progress dicts returned by workflow queries
+FAST_TYPES = (
+    ClaudePromptInput,
+    ClaudeResponse,
+    ClaudeBatchInput,
+    ClaudeBatchItem,
+    ClaudeBatchResult,
+    ProjectMessagesInput,
+    TokenUsage,
+    List[Dict],
+    List[ClaudeBatchItem],
+    Dict[str, int],
+)
+
+_FAST_TYPES = frozenset(FAST_TYPES)
+_ADAPTERS: Dict[Any, Any] = {}
+
+
+def _adapter(type_hint: Any) -> Any:
+    """
+    Get the pydantic TypeAdapter for one of FAST_TYPES, or None for other
+    types. Built on first use, so importing this module doesn't import pydantic.
+    """
+    adapter = _ADAPTERS.get(type_hint)
+    if adapter is None and type_hint in _FAST_TYPES:
+        from pydantic import TypeAdapter
+        adapter = _ADAPTERS[type_hint] = TypeAdapter(type_hint)
+    return adapter
+
+
+class FastJSONPlainPayloadConverter(JSONPlainPayloadConverter):
+    """
+    Drop-in replacement for the SDK's "json/plain" converter, backed by
+    pydantic-core (serialization) and jiter (parsing).
+
+    Payloads stay wire-compatible: same encoding, same JSON documents. Only
+    the key order differs (field order instead of sorted), which no JSON
+    reader depends on, so workers, clients and histories using the default
+    converter can read these payloads and vice versa. Values pydantic-core
+    can't serialize fall back to the default encoder.
+    """
+
+    def to_payload(self, value: Any) -> Optional[Payload]:
+        try:
+            # Serializes dataclasses natively, without dataclasses.asdict()
+            # copies. inf/nan are written as Infinity/NaN like json.dumps does.
+            data = pydantic_core.to_json(value, inf_nan_mode="constants")
+        except pydantic_core.PydanticSerializationError:
+            return super().to_payload(value)
+        return Payload(metadata={"encoding": self.encoding.encode()}, data=data)
+
+    def from_payload(self, payload: Payload, type_hint: Optional[Type] = None) -> Any:
+        adapter = _adapter(type_hint)
+        try:
+            if adapter is not None:
+                return adapter.validate_json(payload.data)
+            obj = pydantic_core.from_json(payload.data)
+        except pydantic_core.ValidationError as err:
+            raise TypeError(f"Failed converting payload to {type_hint}: {err}") from err
+        except ValueError as err:
+            raise RuntimeError("Failed parsing") from err
+        if type_hint:
+            obj = value_to_type(type_hint, obj, self._custom_type_converters)
+        return obj
+
+
+class FastPayloadConverter(CompositePayloadConverter):
+    """The default payload converters, with "json/plain" swapped for FastJSONPlainPayloadConverter."""
+
+    def __init__(self):
+        super().__init__(
+            *(
+                FastJSONPlainPayloadConverter() if isinstance(c, JSONPlainPayloadConverter) else c
+                for c in DefaultPayloadConverter.default_encoding_payload_converters
+            )
+        )
+
+
+fast_data_converter = DataConverter(payload_converter_class=FastPayloadConverter)
+
+
+def _with_owner_metadata(payload_converter_class: Type[CompositePayloadConverter]) -> Type[CompositePayloadConverter]:
+    """
+    Subclass a payload converter to tag every payload with the conversation
+    it belongs to, for the claim-check codec's garbage collection. Tagging has
+    to happen here: the converter runs inside the workflow (or activity, or
+    gateway request), while the codec runs later without that context.
+    """
+
+    class OwnerTaggingPayloadConverter(payload_converter_class):
+        def to_payloads(self, values: Sequence[Any]) -> List[Payload]:
+            payloads = super().to_payloads(values)
+            owner = current_owner()
+            if owner is not None:
+                for payload in payloads:
+                    payload.metadata[OWNER_METADATA_KEY] = owner.encode()
+            return payloads
+
+    return OwnerTaggingPayloadConverter
+
+
+def get_data_converter() -> DataConverter:
+    """
+    Get the data converter selected by PAYLOAD_CONVERTER: "fast" (default)
+    or "default" for the SDK's stdlib-json converter. Unless BLOB_STORE_BACKEND
+    is "none", large payloads are offloaded by the claim-check codec.
+    Returns:
+        The data converter, to pass to Client.connect
+    """
+    name = os.environ.get("PAYLOAD_CONVERTER", "fast")
+    if name == "fast":
+        data_converter = fast_data_converter
+    elif name == "default":
+        data_converter = DataConverter.default
+    else:
+        raise ValueError(f"Unknown PAYLOAD_CONVERTER: {name}")
+
+    codec = get_claim_check_codec()
+    if codec is None:
+        return data_converter
+    return dataclasses.replace(
+        data_converter,
+        payload_converter_class=_with_owner_metadata(data_converter.payload_converter_class),
+        payload_codec=codec,
+    )
@@ -0,0 +1,168 @@
+import os
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+class HistoryStore(ABC):
+    """
+    Read-side store for conversation messages.
+
+    The chat workflow projects every finished turn into the store, so history
+    reads don't need a workflow query (and therefore a worker). Subclass this
+    to plug in a different backend and register it in BACKENDS.
+    """
+
+    @abstractmethod
+    def append_messages(self, conversation_id: str, messages: List[Dict]) -> None:
+        """
+        Write messages for a conversation. Writing the same index twice
+        overwrites it, so retried projections are harmless.
+        Args:
+            conversation_id: The workflow ID of the conversation
+            messages: Messages with index, role, content, and timestamp
+        """
+
+    @abstractmethod
+    def get_messages(self, conversation_id: str, since_index: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Read messages for a conversation, ordered by index.
+        Args:
+            conversation_id: The workflow ID of the conversation
+            since_index: Index of the first message to return
+            limit: Maximum number of messages to return (all if None)
+        Returns:
+            List of messages with index, role, content, and timestamp
+        """
+
+    @abstractmethod
+    def set_usage(self, conversation_id: str, usage: Dict) -> None:
+        """
+        Replace a conversation's token usage totals.
+        Args:
+            conversation_id: The workflow ID of the conversation
+            usage: TokenUsage fields as a dict
+        """
+
+    @abstractmethod
+    def get_usage(self, conversation_id: str) -> Optional[Dict]:
+        """
+        Read a conversation's token usage totals.
+        Returns:
+            TokenUsage fields as a dict, or None if nothing was recorded
+        """
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """HistoryStore backed by a local SQLite database in WAL mode."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # sqlite3 connections can't be shared across threads (Flask serves
+        # requests on several), so each thread gets its own
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            # WAL lets the gateway read while the worker writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    conversation_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    PRIMARY KEY (conversation_id, idx)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS messages_by_time ON messages (conversation_id, timestamp)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS usage (
+                    conversation_id TEXT PRIMARY KEY,
+                    usage TEXT NOT NULL
+                )
+                """
+            )
+
+    def append_messages(self, conversation_id: str, messages: List[Dict]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages (conversation_id, idx, role, content, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (conversation_id, msg["index"], msg["role"], msg["content"], msg["timestamp"])
+                    for msg in messages
+                ],
+            )
+
+    def get_messages(self, conversation_id: str, since_index: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT idx, role, content, timestamp FROM messages "
+            "WHERE conversation_id = ? AND idx >= ? ORDER BY idx LIMIT ?",
+            (conversation_id, since_index, -1 if limit is None else limit),
+        ).fetchall()
+        return [
+            {"index": idx, "role": role, "content": content, "timestamp": timestamp}
+            for idx, role, content, timestamp in rows
+        ]
+
+    def set_usage(self, conversation_id: str, usage: Dict) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO usage (conversation_id, usage) VALUES (?, ?)",
+                (conversation_id, json.dumps(usage)),
+            )
+
+    def get_usage(self, conversation_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT usage FROM usage WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+# Available backends, selected with HISTORY_STORE_BACKEND
+BACKENDS = {
+    "sqlite": lambda: SQLiteHistoryStore(os.environ.get("HISTORY_DB_PATH", "chat_history.db")),
+}
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> Optional[HistoryStore]:
+    """
+    Get the process-wide history store.
+    Returns:
+        The configured store, or None if HISTORY_STORE_BACKEND is "none"
+    """
+    global _store
+    backend = os.environ.get("HISTORY_STORE_BACKEND", "sqlite")
+    if backend == "none":
+        return None
+
+    with _store_lock:
+        if _store is None:
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown HISTORY_STORE_BACKEND: {backend}")
+            _store = BACKENDS[backend]()
+    return _store
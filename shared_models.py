@@ -1,5 +1,34 @@
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional
+from temporalio.common import SearchAttributeKey
+
+# Search attributes upserted by ClaudeChatWorkflow. They must be registered in
+# the namespace first (see README).
+CLAUDE_MODEL_ATTR = SearchAttributeKey.for_keyword("ClaudeModel")
+CLAUDE_TURN_COUNT_ATTR = SearchAttributeKey.for_int("ClaudeTurnCount")
+CLAUDE_LAST_ACTIVITY_ATTR = SearchAttributeKey.for_datetime("ClaudeLastActivity")
+CLAUDE_STATUS_ATTR = SearchAttributeKey.for_keyword("ClaudeStatus")  # "idle", "processing", "expired" or "ended"
+
+# ApplicationError type raised by get_claude_response when the tenant already
+# has its share of Claude calls in progress. Its first detail is the number
+# of seconds to wait before calling again.
+TENANT_THROTTLED_ERROR = "TenantThrottled"
+# ApplicationError type raised by get_claude_response while the circuit
+# breaker for the model is open. Its first detail is the number of seconds
+# until the breaker lets calls through again.
+CLAUDE_UNAVAILABLE_ERROR = "ClaudeUnavailable"
+# ApplicationError type raised by get_claude_response when the prompt plus
+# max_tokens can't fit the model's context window
+CONTEXT_WINDOW_EXCEEDED_ERROR = "ContextWindowExceeded"
+
+# Task queue of get_claude_response calls per priority. Workflows and
+# interactive calls share claude-queue; background calls have their own queue
+# and worker capacity, so a large batch can't hold up interactive chat turns.
+PRIORITY_TASK_QUEUES = {
+    "interactive": "claude-queue",
+    "background": "claude-background-queue",
+}
+
 
 @dataclass
 class ClaudePromptInput:
@@ -7,16 +36,120 @@ class ClaudePromptInput:
     model: str = "claude-3-7-sonnet-20250219"
     max_tokens: int = 1024
     conversation_history: Optional[List[Dict]] = None
+    # Chat only: answer all messages queued during a turn with one Claude call
+    batch_pending_messages: bool = False
+    # Chat only: end the conversation after this long without a message
+    inactivity_timeout_seconds: int = 30 * 60
+    # Chat only: send at most this many recent messages to Claude (all if None).
+    # Older messages are truncated in workflow memory.
+    context_window_messages: Optional[int] = None
+    # Who the work is for, for per-tenant fair scheduling of Claude calls
+    tenant_id: Optional[str] = None
+    # Key of PRIORITY_TASK_QUEUES: which lane the Claude call runs in
+    priority: str = "interactive"
+    # Estimated input tokens of conversation_history, if the caller already
+    # has one (see token_estimate.py)
+    estimated_input_tokens: Optional[int] = None
 
 
 @dataclass
 class ClaudeResponse:
     text: str
     request_id: str = ""
+    input_tokens: int = 0  # uncached input tokens
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    stop_reason: Optional[str] = None
+    latency_ms: float = 0.0  # time spent in the Claude API call
 
 
 @dataclass
+class TokenUsage:
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    # Full prompt size of the latest call (input + cache read + cache creation)
+    last_context_tokens: int = 0
+    last_stop_reason: Optional[str] = None
+    latency_ms: float = 0.0  # total time spent in Claude API calls
+
+    def add(self, response: ClaudeResponse) -> None:
+        """Add one Claude call's usage to the totals."""
+        self.requests += 1
+        self.input_tokens += response.input_tokens
+        self.output_tokens += response.output_tokens
+        self.cache_read_input_tokens += response.cache_read_input_tokens
+        self.cache_creation_input_tokens += response.cache_creation_input_tokens
+        self.last_context_tokens = (
+            response.input_tokens + response.cache_read_input_tokens + response.cache_creation_input_tokens
+        )
+        self.last_stop_reason = response.stop_reason
+        self.latency_ms += response.latency_ms
+
+    def merge(self, other: "TokenUsage") -> None:
+        """Add another set of totals (e.g. a child workflow's) to these."""
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_read_input_tokens += other.cache_read_input_tokens
+        self.cache_creation_input_tokens += other.cache_creation_input_tokens
+        self.latency_ms += other.latency_ms
+
+
+@dataclass
+class ProjectMessagesInput:
+    conversation_id: str
+    messages: List[Dict]  # index, role, content, timestamp
+    usage: Optional[TokenUsage] = None  # conversation totals after these messages
+
+
+@dataclass(slots=True)
 class ChatMessage:
     role: str  # "user" or "assistant"
     content: str
-    timestamp: float
\ No newline at end of file
+    timestamp: float
+    # True once content has been cut down to a preview; the full text is in
+    # event history and the history store
+    truncated: bool = False
+    # Estimated tokens of this message, computed once (see token_estimate.py)
+    tokens: int = 0
+
+
+# A user message waiting in ClaudeChatWorkflow for its turn. Lives here rather
+# than in workflows.py so the sandbox doesn't rebuild the class per workflow run.
+@dataclass(slots=True)
+class QueuedMessage:
+    content: str
+    timestamp: float
+    done: bool = False
+    reply: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class ClaudeBatchInput:
+    prompts: List[str]
+    model: str = "claude-3-7-sonnet-20250219"
+    max_tokens: int = 1024
+    max_concurrency: int = 5  # in-flight activities at once, across child workflows too
+    chunk_size: int = 100  # prompts per child workflow
+    start_index: int = 0  # offset of prompts[0] in the overall batch
+    tenant_id: Optional[str] = None
+    priority: str = "background"  # key of PRIORITY_TASK_QUEUES
+
+
+@dataclass
+class ClaudeBatchItem:
+    index: int
+    text: Optional[str] = None
+    request_id: str = ""
+    error: Optional[str] = None
+
+
+@dataclass
+class ClaudeBatchResult:
+    items: List[ClaudeBatchItem] = field(default_factory=list)
+    usage: TokenUsage = field(default_factory=TokenUsage)
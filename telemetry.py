@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+import atexit
+import logging
+import contextlib
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, ContextManager, List, TypeVar
+
+from temporalio.client import (
+    Interceptor,
+    OutboundInterceptor,
+    StartWorkflowInput,
+    QueryWorkflowInput,
+    SignalWorkflowInput,
+    DescribeWorkflowInput,
+    StartWorkflowUpdateInput,
+    StartWorkflowUpdateWithStartInput,
+)
+from temporalio.common import MetricMeter
+from temporalio.runtime import PrometheusConfig, Runtime, TelemetryConfig
+
+# The opentelemetry module once configure_tracing() enabled tracing. Tracing
+# is optional (pip install opentelemetry-sdk, plus opentelemetry-exporter-otlp
+# for OTLP export) and imported only when enabled, since it is slow to import.
+trace = None
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def create_runtime(bind_address: str) -> Runtime:
+    """
+    Create a Temporal runtime that serves metrics for Prometheus at
+    http://<bind_address>/metrics. Besides the SDK's own client and worker
+    metrics, anything recorded on runtime.metric_meter is exported there.
+    Args:
+        bind_address: host:port to serve metrics on
+    Returns:
+        The runtime, to pass to Client.connect
+    """
+    logger.info(f"Serving metrics on http://{bind_address}/metrics")
+    return Runtime(telemetry=TelemetryConfig(metrics=PrometheusConfig(bind_address=bind_address)))
+
+
+def record_duration(meter: MetricMeter, name: str, description: str, start: float, **attributes: Any) -> None:
+    """
+    Record the time since `start` (a time.monotonic() value) on a duration histogram.
+    Args:
+        meter: Meter to record on, e.g. runtime.metric_meter or activity.metric_meter()
+        name: Histogram name
+        description: Histogram description
+        start: time.monotonic() at the start of the measured operation
+        attributes: Extra metric labels
+    """
+    meter.create_histogram_timedelta(name, description, "duration").record(
+        timedelta(seconds=time.monotonic() - start), attributes or None
+    )
+
+
+def increment(meter: MetricMeter, name: str, description: str, value: int = 1, **attributes: Any) -> None:
+    """Add `value` to a counter."""
+    if value > 0:
+        meter.create_counter(name, description).add(value, attributes or None)
+
+
+def configure_tracing(service_name: str) -> List[Interceptor]:
+    """
+    Set up OpenTelemetry tracing for this process, as chosen by OTEL_TRACES_EXPORTER:
+    "console" (stdout), "file" (JSON spans appended to OTEL_TRACES_FILE,
+    default traces.jsonl), "otlp" (OTEL_EXPORTER_OTLP_* settings) or "none".
+    Args:
+        service_name: service.name resource attribute, e.g. "claude-gateway"
+    Returns:
+        Interceptors to pass to Client.connect. The tracing interceptor also
+        applies to workers created from that client, which carries the trace
+        from the gateway through the workflow into the activities.
+    """
+    global trace
+    exporter_name = os.environ.get("OTEL_TRACES_EXPORTER", "none").lower()
+    if exporter_name == "none":
+        return []
+    try:
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from temporalio.contrib.opentelemetry import TracingInterceptor
+    except ImportError:
+        logger.warning("OTEL_TRACES_EXPORTER is set but opentelemetry-sdk is not installed; tracing disabled")
+        return []
+
+    if exporter_name == "console":
+        exporter = ConsoleSpanExporter(out=sys.stdout)
+    elif exporter_name == "file":
+        trace_file = open(os.environ.get("OTEL_TRACES_FILE", "traces.jsonl"), "a")
+        exporter = ConsoleSpanExporter(
+            out=trace_file, formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    elif exporter_name == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+    else:
+        raise ValueError(f"Unknown OTEL_TRACES_EXPORTER: {exporter_name}")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    otel_trace.set_tracer_provider(provider)
+    trace = otel_trace
+    # Flush buffered spans on exit
+    atexit.register(provider.shutdown)
+    logger.info(f"Exporting traces for {service_name} to {exporter_name}")
+    return [TracingInterceptor()]
+
+
+def start_span(name: str, **attributes: Any) -> ContextManager[Any]:
+    """
+    Start a span as a child of the current one, or do nothing when tracing
+    isn't enabled. Use as a context manager.
+    """
+    if trace is None:
+        return contextlib.nullcontext()
+    return trace.get_tracer(__name__).start_as_current_span(name, attributes=attributes)
+
+
+class TemporalCallMetricsInterceptor(Interceptor):
+    """Client interceptor recording the latency of every Temporal call the gateway makes."""
+
+    def __init__(self, meter: MetricMeter):
+        self.meter = meter
+
+    def intercept_client(self, next: OutboundInterceptor) -> OutboundInterceptor:
+        return _TemporalCallMetricsOutbound(next, self.meter)
+
+
+class _TemporalCallMetricsOutbound(OutboundInterceptor):
+    def __init__(self, next: OutboundInterceptor, meter: MetricMeter):
+        super().__init__(next)
+        self.meter = meter
+
+    async def _timed(self, operation: str, call: Callable[[], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        status = "error"
+        try:
+            result = await call()
+            status = "ok"
+            return result
+        finally:
+            record_duration(
+                self.meter,
+                "claude_temporal_call_latency",
+                "Latency of Temporal client calls made by the gateway",
+                start,
+                operation=operation,
+                status=status,
+            )
+
+    async def start_workflow(self, input: StartWorkflowInput) -> Any:
+        return await self._timed("start_workflow", lambda: self.next.start_workflow(input))
+
+    async def query_workflow(self, input: QueryWorkflowInput) -> Any:
+        return await self._timed("query_workflow", lambda: self.next.query_workflow(input))
+
+    async def signal_workflow(self, input: SignalWorkflowInput) -> None:
+        return await self._timed("signal_workflow", lambda: self.next.signal_workflow(input))
+
+    async def describe_workflow(self, input: DescribeWorkflowInput) -> Any:
+        return await self._timed("describe_workflow", lambda: self.next.describe_workflow(input))
+
+    async def start_workflow_update(self, input: StartWorkflowUpdateInput) -> Any:
+        return await self._timed("start_workflow_update", lambda: self.next.start_workflow_update(input))
+
+    async def start_update_with_start_workflow(self, input: StartWorkflowUpdateWithStartInput) -> Any:
+        return await self._timed("update_with_start", lambda: self.next.start_update_with_start_workflow(input))
@@ -0,0 +1,91 @@
+import os
+import threading
+from typing import Dict, Optional
+
+
+# Metric label for work that doesn't carry a tenant, e.g. requests that
+# named none or workflows started before tenants were recorded
+DEFAULT_TENANT = "default"
+
+
+class TenantLimiter:
+    """
+    Caps how many Claude calls each tenant can have in progress at once in
+    this worker, so one tenant with many busy conversations can't take all
+    of the worker's activity slots.
+
+    Callers that don't get a slot should give up their activity slot and try
+    again later rather than wait for one (see get_claude_response). Work
+    without a tenant isn't limited.
+    """
+
+    def __init__(self, default_limit: int, limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            default_limit: Concurrent calls per tenant; 0 means unlimited
+            limits: Per-tenant overrides of default_limit, e.g. a larger
+                share for a paying tenant
+        """
+        self.default_limit = default_limit
+        self.limits = limits or {}
+        self._in_progress: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def limit(self, tenant: str) -> int:
+        return self.limits.get(tenant, self.default_limit)
+
+    def acquire(self, tenant: Optional[str]) -> bool:
+        """
+        Take a call slot for `tenant` without waiting.
+        Returns:
+            False if the tenant is at its limit
+        """
+        if not tenant:
+            return True
+        limit = self.limit(tenant)
+        with self._lock:
+            in_progress = self._in_progress.get(tenant, 0)
+            if limit > 0 and in_progress >= limit:
+                return False
+            self._in_progress[tenant] = in_progress + 1
+        return True
+
+    def release(self, tenant: Optional[str]) -> None:
+        """Give back a slot taken with acquire()."""
+        if not tenant:
+            return
+        with self._lock:
+            in_progress = self._in_progress.get(tenant, 0) - 1
+            if in_progress > 0:
+                self._in_progress[tenant] = in_progress
+            else:
+                self._in_progress.pop(tenant, None)
+
+
+def parse_limits(value: str) -> Dict[str, int]:
+    """Parse "tenant-a=16,tenant-b=2" into {"tenant-a": 16, "tenant-b": 2}."""
+    limits = {}
+    for entry in value.split(","):
+        if entry.strip():
+            tenant, _, limit = entry.partition("=")
+            limits[tenant.strip()] = int(limit)
+    return limits
+
+
+_limiter: Optional[TenantLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_tenant_limiter() -> TenantLimiter:
+    """
+    Get the worker's tenant limiter, configured by TENANT_MAX_CONCURRENT_CALLS
+    (default 8, 0 disables) and TENANT_CONCURRENCY_LIMITS overrides.
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = TenantLimiter(
+                int(os.environ.get("TENANT_MAX_CONCURRENT_CALLS", 8)),
+                parse_limits(os.environ.get("TENANT_CONCURRENCY_LIMITS", "")),
+            )
+    return _limiter
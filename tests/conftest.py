@@ -0,0 +1,144 @@
+"""
+Fixtures that run the gateway against a local Temporal dev server, a worker
+and the mock Claude API from benchmarks/, all in this process.
+
+The dev server is started with WorkflowEnvironment.start_local (downloaded
+on first use); tests that need it are skipped if it can't be started.
+"""
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import uuid
+
+import pytest
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Keep the stores the gateway and activities write to out of the repo, and
+# the gateway's metrics off its default port
+_workdir = tempfile.mkdtemp(prefix="claude-tests-")
+os.environ.update(
+    HISTORY_DB_PATH=os.path.join(_workdir, "chat_history.db"),
+    BLOB_STORE_PATH=os.path.join(_workdir, "blobs"),
+    BLOB_REFS_DB_PATH=os.path.join(_workdir, "blob_refs.db"),
+    GATEWAY_METRICS_ADDRESS=f"127.0.0.1:{free_port()}",
+)
+
+from temporalio.client import Client  # noqa: E402
+from temporalio.testing import WorkflowEnvironment  # noqa: E402
+from temporalio.worker import Worker  # noqa: E402
+
+from mock_claude_server import MockConfig, start_mock_server  # noqa: E402
+from shared_models import (  # noqa: E402
+    CLAUDE_MODEL_ATTR,
+    CLAUDE_TURN_COUNT_ATTR,
+    CLAUDE_LAST_ACTIVITY_ATTR,
+    CLAUDE_STATUS_ATTR,
+    PRIORITY_TASK_QUEUES,
+)
+
+
+class TemporalStack:
+    """
+    A dev server and a worker running on an event loop in a background
+    thread, so the Flask test client can call the gateway from the test's
+    thread the way a real client would.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self.env = None
+        self.client = None
+        self._worker_task = None
+
+    def run(self, coro, timeout: float = 60):
+        """Run a coroutine on the stack's event loop and return its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def start(self) -> None:
+        from activities import get_claude_response, project_messages, release_payload_blobs
+        from converter import get_data_converter
+        from workflows import ClaudeChatWorkflow, ClaudeBatchWorkflow
+        from worker import create_workflow_runner
+
+        self.env = await WorkflowEnvironment.start_local(search_attributes=[
+            CLAUDE_MODEL_ATTR, CLAUDE_TURN_COUNT_ATTR, CLAUDE_LAST_ACTIVITY_ATTR, CLAUDE_STATUS_ATTR,
+        ])
+        self.client = await Client.connect(
+            self.env.client.service_client.config.target_host,
+            data_converter=get_data_converter(),
+        )
+        worker = Worker(
+            self.client,
+            task_queue=PRIORITY_TASK_QUEUES["interactive"],
+            workflows=[ClaudeChatWorkflow, ClaudeBatchWorkflow],
+            activities=[get_claude_response, project_messages, release_payload_blobs],
+            workflow_runner=create_workflow_runner(),
+        )
+        self._worker_task = asyncio.ensure_future(worker.run())
+
+    async def stop(self) -> None:
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            await asyncio.gather(self._worker_task, return_exceptions=True)
+        if self.env is not None:
+            await self.env.shutdown()
+
+    def close(self) -> None:
+        self.run(self.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=10)
+
+
+@pytest.fixture(scope="session")
+def mock_claude():
+    """Mock Anthropic API the activities call instead of Claude."""
+    server, stats = start_mock_server(MockConfig(ttft_ms=5, tokens_per_second=10_000, output_tokens=20))
+    os.environ["ANTHROPIC_API_KEY"] = "mock"
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    yield stats
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def temporal(mock_claude):
+    """Dev server with the search attributes registered, plus a worker."""
+    stack = TemporalStack()
+    try:
+        stack.run(stack.start(), timeout=300)
+    except Exception as e:
+        stack.close()
+        pytest.skip(f"Temporal dev server unavailable: {e}")
+    os.environ["TEMPORAL_ADDRESS"] = stack.env.client.service_client.config.target_host
+    yield stack
+    stack.close()
+
+
+@pytest.fixture
+def gateway(temporal):
+    """Flask test client for the gateway, connected to the dev server."""
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def model():
+    """
+    A model name unique to the test, so filters only match conversations the
+    test started. The mock API answers for any model.
+    """
+    return f"claude-test-{uuid.uuid4().hex[:12]}"
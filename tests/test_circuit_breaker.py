@@ -0,0 +1,132 @@
+"""
+CircuitBreaker state machine, with time.monotonic() controlled by the test.
+"""
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", window_seconds=60, min_calls=4, error_rate=0.5,
+                          slow_call_seconds=20, slow_rate=0.8, open_seconds=30)
+
+
+def call(breaker, failed=False, seconds=0.1):
+    generation = breaker.allow()
+    assert generation is not None
+    breaker.record(generation, failed, seconds)
+
+
+def trip(breaker):
+    for _ in range(4):
+        call(breaker, failed=True)
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls(breaker):
+    for _ in range(3):
+        call(breaker, failed=True)
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_error_rate(breaker):
+    call(breaker)
+    call(breaker)
+    call(breaker, failed=True)
+    assert breaker.state == CLOSED
+    call(breaker, failed=True)
+    assert breaker.state == OPEN
+
+
+def test_opens_on_slow_rate(breaker):
+    for _ in range(4):
+        call(breaker, seconds=25)
+    assert breaker.state == OPEN
+
+
+def test_old_calls_leave_the_window(breaker, clock):
+    for _ in range(3):
+        call(breaker, failed=True)
+    clock.now += 61
+    call(breaker, failed=True)
+    assert breaker.state == CLOSED
+
+
+def test_rejects_while_open(breaker, clock):
+    trip(breaker)
+    assert breaker.allow() is None
+    clock.now += 10
+    assert breaker.retry_after() == pytest.approx(20)
+
+
+def test_probe_success_closes(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+    probe = breaker.allow()
+    assert probe is not None and breaker.state == HALF_OPEN
+    # Only half_open_probes calls go through
+    assert breaker.allow() is None
+    breaker.record(probe, False, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_probe_failure_reopens(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+    probe = breaker.allow()
+    breaker.record(probe, True, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+
+
+def test_slow_probe_reopens(breaker, clock):
+    trip(breaker)
+    clock.now += 30
+    breaker.record(breaker.allow(), False, 25)
+    assert breaker.state == OPEN
+
+
+def test_call_from_before_opening_does_not_end_half_open(breaker, clock):
+    # Allowed while closed, finishes after the breaker opened and went half open
+    straggler = breaker.allow()
+    trip(breaker)
+    clock.now += 30
+    probe = breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+    breaker.record(straggler, False, 0.1)
+    assert breaker.state == HALF_OPEN
+    # The probe slot is still taken until the probe finishes
+    assert breaker.allow() is None
+
+    breaker.record(probe, True, 0.1)
+    assert breaker.state == OPEN
+
+
+def test_stale_failures_not_counted_after_closing(breaker, clock):
+    stragglers = [breaker.allow() for _ in range(4)]
+    trip(breaker)
+    clock.now += 30
+    breaker.record(breaker.allow(), False, 0.1)
+    assert breaker.state == CLOSED
+
+    for generation in stragglers:
+        breaker.record(generation, True, 0.1)
+    assert breaker.state == CLOSED
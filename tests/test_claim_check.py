@@ -0,0 +1,99 @@
+"""
+Claim-check blob garbage collection: release() and sweep() against a local
+blob store, with the grace period controlled through time.time().
+"""
+import asyncio
+
+import pytest
+from temporalio.api.common.v1 import Payload
+
+import claim_check
+from claim_check import BlobRefIndex, ClaimCheckCodec, LocalBlobStore, OWNER_METADATA_KEY
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(claim_check.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def codec(tmp_path, clock):
+    return ClaimCheckCodec(
+        LocalBlobStore(str(tmp_path / "blobs")),
+        BlobRefIndex(str(tmp_path / "blob_refs.db")),
+        threshold=16,
+        grace_seconds=600,
+    )
+
+
+def offload(codec, owner, data):
+    """Encode a payload over the threshold for owner and return its blob key."""
+    payload = Payload(metadata={OWNER_METADATA_KEY: owner.encode()}, data=data)
+    [encoded] = asyncio.run(codec.encode([payload]))
+    return encoded.data.decode()
+
+
+def test_release_deletes_only_after_grace_period(codec, clock):
+    key = offload(codec, "chat-1", b"x" * 100)
+
+    assert codec.release(["chat-1"]) == 0
+    assert codec.store.exists(key)
+
+    clock.now += 601
+    assert codec.release(["chat-2"]) == 1
+    assert not codec.store.exists(key)
+
+
+def test_shared_blob_kept_while_referenced(codec, clock):
+    key = offload(codec, "chat-1", b"x" * 100)
+    offload(codec, "chat-2", b"x" * 100)
+
+    codec.release(["chat-1"])
+    clock.now += 601
+    assert codec.sweep() == 0
+    assert codec.store.exists(key)
+
+    codec.release(["chat-2"])
+    clock.now += 601
+    assert codec.sweep() == 1
+    assert not codec.store.exists(key)
+
+
+def test_sweep_deletes_expired_orphans_without_another_release(codec, clock):
+    key = offload(codec, "chat-1", b"x" * 100)
+    codec.release(["chat-1"])
+
+    assert codec.sweep() == 0
+    clock.now += 601
+    assert codec.sweep() == 1
+    assert not codec.store.exists(key)
+    assert codec.sweep() == 0
+
+
+def test_release_several_owners(codec, clock):
+    keys = [offload(codec, f"batch-chunk-{n}", bytes([n]) * 100) for n in range(3)]
+
+    codec.release([f"batch-chunk-{n}" for n in range(3)])
+    clock.now += 601
+    assert codec.sweep() == 3
+    assert not any(codec.store.exists(key) for key in keys)
+
+
+def test_reference_rescues_orphan(codec, clock):
+    key = offload(codec, "chat-1", b"x" * 100)
+    codec.release(["chat-1"])
+    offload(codec, "chat-2", b"x" * 100)
+
+    clock.now += 601
+    assert codec.sweep() == 0
+    assert codec.store.exists(key)
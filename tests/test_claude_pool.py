@@ -0,0 +1,132 @@
+"""
+ClaudeClientPool load balancing and ejection, with time.monotonic()
+controlled by the test.
+"""
+import json
+from collections import Counter
+
+import pytest
+
+import claude_pool
+from claude_pool import ClaudeClientPool, ClaudeEndpoint, load_endpoints
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(claude_pool.time, "monotonic", clock)
+    return clock
+
+
+def make_pool(*weights, **kwargs):
+    endpoints = [ClaudeEndpoint(name, f"key-{name}", weight=w) for name, w in zip("abc", weights)]
+    return ClaudeClientPool(endpoints, **kwargs)
+
+
+def names(pool, calls):
+    return "".join(pool.choose().name for _ in range(calls))
+
+
+def test_weighted_round_robin_is_smooth(clock):
+    pool = make_pool(5, 1, 1)
+    # Nginx's smooth weighted round-robin sequence for weights 5, 1, 1
+    assert names(pool, 7) == "aabacaa"
+    assert names(pool, 7) == "aabacaa"
+
+
+def test_weights_spread_calls(clock):
+    pool = make_pool(2, 1)
+    assert names(pool, 3) == "aba"
+    assert Counter(names(pool, 300)) == {"a": 200, "b": 100}
+
+
+def test_ejected_endpoint_is_skipped_until_it_recovers(clock):
+    pool = make_pool(1, 1, ejection_seconds=5)
+    a = pool.endpoints[0]
+    assert pool.report_failure(a) == 5
+    assert set(names(pool, 4)) == {"b"}
+
+    clock.now += 5
+    assert set(names(pool, 4)) == {"a", "b"}
+
+
+def test_ejection_backs_off_and_is_capped(clock):
+    pool = make_pool(1, 1, ejection_seconds=5, max_ejection_seconds=30)
+    a = pool.endpoints[0]
+    assert [pool.report_failure(a) for _ in range(5)] == [5, 10, 20, 30, 30]
+
+
+def test_success_resets_backoff(clock):
+    pool = make_pool(1, 1, ejection_seconds=5)
+    a = pool.endpoints[0]
+    pool.report_failure(a)
+    pool.report_failure(a)
+    pool.report_success(a)
+    assert a.healthy(clock.now)
+    assert pool.report_failure(a) == 5
+
+
+def test_retry_after_floors_ejection(clock):
+    pool = make_pool(1, 1, ejection_seconds=5, max_ejection_seconds=120)
+    a, b = pool.endpoints
+    assert pool.report_failure(a, retry_after=42) == 42
+    # Shorter than the backoff: the backoff wins
+    assert pool.report_failure(b, retry_after=1) == 5
+    # Still capped
+    assert pool.report_failure(a, retry_after=600) == 120
+
+
+def test_choose_excluding_the_only_healthy_endpoint_returns_none(clock):
+    pool = make_pool(1, 1)
+    pool.report_failure(pool.endpoints[0])
+    assert pool.choose(exclude={"b"}) is None
+    assert pool.choose(exclude={"a", "b"}) is None
+
+
+def test_choose_excludes_tried_endpoints(clock):
+    pool = make_pool(1, 1)
+    assert set(pool.choose(exclude={"a"}).name for _ in range(3)) == {"b"}
+
+
+def test_choose_without_healthy_endpoint_returns_first_to_recover(clock):
+    pool = make_pool(1, 1, ejection_seconds=5)
+    a, b = pool.endpoints
+    pool.report_failure(a, retry_after=60)
+    pool.report_failure(b)
+    assert pool.choose() is b
+
+
+def test_status(clock):
+    pool = make_pool(2, 1, ejection_seconds=5)
+    pool.report_failure(pool.endpoints[1])
+    clock.now += 2
+    assert pool.status() == [
+        {"name": "a", "weight": 2, "healthy": True, "ejected_for_seconds": 0.0, "consecutive_failures": 0},
+        {"name": "b", "weight": 1, "healthy": False, "ejected_for_seconds": 3.0, "consecutive_failures": 1},
+    ]
+
+
+def test_load_endpoints(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_KEY_A", "key-a")
+    monkeypatch.setenv("ANTHROPIC_ENDPOINTS", json.dumps([
+        {"name": "a", "api_key_env": "ANTHROPIC_KEY_A", "weight": 2},
+        {"api_key": "key-b", "base_url": "https://b.example"},
+    ]))
+    a, b = load_endpoints()
+    assert (a.name, a.api_key, a.weight) == ("a", "key-a", 2)
+    assert (b.name, b.api_key, b.base_url, b.weight) == ("endpoint-1", "key-b", "https://b.example", 1)
+
+
+def test_load_endpoints_needs_a_key(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_ENDPOINTS", json.dumps([{"name": "a", "api_key_env": "UNSET_KEY"}]))
+    monkeypatch.delenv("UNSET_KEY", raising=False)
+    with pytest.raises(ValueError):
+        load_endpoints()
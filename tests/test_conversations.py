@@ -0,0 +1,132 @@
+"""
+Conversation search attributes and /api/conversations, against a local
+Temporal dev server (see conftest.py).
+"""
+import time
+
+from shared_models import (
+    CLAUDE_MODEL_ATTR,
+    CLAUDE_TURN_COUNT_ATTR,
+    CLAUDE_LAST_ACTIVITY_ATTR,
+    CLAUDE_STATUS_ATTR,
+)
+
+
+def chat(gateway, model, conversation_id=None):
+    """Send one message through /api/chat and return the conversation ID."""
+    response = gateway.post("/api/chat", json={
+        "prompt": "Hello",
+        "model": model,
+        "maxTokens": 50,
+        "conversationId": conversation_id,
+    })
+    body = response.get_json()
+    assert response.status_code == 200 and "text" in body, body
+    return body["conversationId"]
+
+
+def describe(temporal, conversation_id):
+    return temporal.run(temporal.client.get_workflow_handle(conversation_id).describe())
+
+
+def wait_until(condition, timeout=20.0):
+    """Poll until condition() returns a truthy value; visibility is eventually consistent."""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if result or time.monotonic() > deadline:
+            return result
+        time.sleep(0.2)
+
+
+def list_conversations(gateway, **params):
+    response = gateway.get("/api/conversations", query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def conversation_ids(gateway, **params):
+    return {c["conversationId"] for c in list_conversations(gateway, **params)["conversations"]}
+
+
+def test_search_attributes_upserted(temporal, gateway, model):
+    conversation_id = chat(gateway, model)
+    chat(gateway, model, conversation_id)
+
+    attrs = describe(temporal, conversation_id).typed_search_attributes
+    assert attrs.get(CLAUDE_MODEL_ATTR) == model
+    assert attrs.get(CLAUDE_TURN_COUNT_ATTR) == 2
+    assert attrs.get(CLAUDE_STATUS_ATTR) == "idle"
+    assert attrs.get(CLAUDE_LAST_ACTIVITY_ATTR) is not None
+
+
+def test_ended_conversation_gets_final_status(temporal, gateway, model):
+    conversation_id = chat(gateway, model)
+
+    response = gateway.post(f"/api/end-conversation/{conversation_id}")
+    assert response.get_json()["success"]
+    temporal.run(temporal.client.get_workflow_handle(conversation_id).result())
+
+    attrs = describe(temporal, conversation_id).typed_search_attributes
+    assert attrs.get(CLAUDE_STATUS_ATTR) == "ended"
+    assert attrs.get(CLAUDE_TURN_COUNT_ATTR) == 1
+
+
+def test_list_conversations_filters(temporal, gateway, model):
+    one_turn = chat(gateway, model)
+    two_turns = chat(gateway, model, chat(gateway, model))
+    other_model = chat(gateway, model + "-other")
+    ended = chat(gateway, model)
+    gateway.post(f"/api/end-conversation/{ended}")
+    temporal.run(temporal.client.get_workflow_handle(ended).result())
+
+    assert wait_until(lambda: conversation_ids(gateway, model=model) == {one_turn, two_turns})
+    assert conversation_ids(gateway, model=model, minTurns=2) == {two_turns}
+    assert conversation_ids(gateway, model=model, status="idle") == {one_turn, two_turns}
+    assert conversation_ids(gateway, model=model, status="processing") == set()
+    assert conversation_ids(gateway, model=model + "-other") == {other_model}
+
+    # Closed conversations only with running=false
+    assert wait_until(lambda: conversation_ids(gateway, model=model, running="false", status="ended") == {ended})
+    assert conversation_ids(gateway, model=model, running="false") == {one_turn, two_turns, ended}
+
+    # Nothing has been idle for a minute yet
+    assert conversation_ids(gateway, model=model, idleMinutes=1) == set()
+
+    listed = {c["conversationId"]: c for c in list_conversations(gateway, model=model)["conversations"]}
+    assert listed[two_turns]["turnCount"] == 2
+    assert listed[two_turns]["model"] == model
+    assert listed[two_turns]["status"] == "idle"
+    assert listed[two_turns]["executionStatus"] == "running"
+    assert listed[two_turns]["lastActivity"] is not None
+
+
+def test_list_conversations_pagination(temporal, gateway, model):
+    started = {chat(gateway, model) for _ in range(5)}
+    assert wait_until(lambda: conversation_ids(gateway, model=model) == started)
+
+    seen = []
+    page_token = None
+    pages = 0
+    while True:
+        params = {"model": model, "pageSize": 2}
+        if page_token:
+            params["pageToken"] = page_token
+        page = list_conversations(gateway, **params)
+        assert len(page["conversations"]) <= 2
+        seen.extend(c["conversationId"] for c in page["conversations"])
+        pages += 1
+        page_token = page["nextPageToken"]
+        if not page_token:
+            break
+
+    assert len(seen) == len(started)
+    assert set(seen) == started
+    assert pages >= 3
+
+
+def test_list_conversations_rejects_unsafe_filter_values():
+    # Rejected before any call to Temporal, so no server is needed
+    from app import app
+    response = app.test_client().get("/api/conversations", query_string={"status": "idle' OR 'x' = 'x"})
+    assert response.status_code == 400
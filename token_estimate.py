@@ -0,0 +1,40 @@
+from typing import Dict, List
+
+
+# Context window per model, in tokens: the prompt plus max_tokens must fit.
+# Models not listed have DEFAULT_CONTEXT_WINDOW_TOKENS.
+DEFAULT_CONTEXT_WINDOW_TOKENS = 200_000
+CONTEXT_WINDOW_TOKENS: Dict[str, int] = {
+    "claude-2.0": 100_000,
+    "claude-instant-1.2": 100_000,
+}
+
+# Tokens each message adds for its role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def context_window(model: str) -> int:
+    """Context window of `model` in tokens."""
+    return CONTEXT_WINDOW_TOKENS.get(model, DEFAULT_CONTEXT_WINDOW_TOKENS)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many tokens Claude's tokenizer makes of `text`, erring high.
+    English prose and code average 3.5-4 characters per token. Other scripts
+    get close to one token per character, which their 2-3 bytes per character
+    in UTF-8 track. One token per 3 UTF-8 bytes therefore slightly
+    overestimates both, and costs a single encode, so it is cheap enough to
+    run in workflow code.
+    """
+    return (len(text.encode("utf-8")) + 2) // 3
+
+
+def estimate_message_tokens(content: str) -> int:
+    """Estimated tokens of one message with `content`, including its overhead."""
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_prompt_tokens(messages: List[Dict]) -> int:
+    """Estimated input tokens of a Messages API request with `messages`."""
+    return sum(estimate_message_tokens(str(m.get("content", ""))) for m in messages)
@@ -1,12 +1,18 @@
 import asyncio
+import importlib
 import os
 import logging
 from dotenv import load_dotenv
 from temporalio.client import Client, TLSConfig
 from temporalio.worker import Worker
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner, SandboxRestrictions
 
-from activities import get_claude_response
-from workflows import ClaudeChatWorkflow
+from activities import get_claude_response, project_messages, release_payload_blobs
+from workflows import ClaudeChatWorkflow, ClaudeBatchWorkflow
+from telemetry import create_runtime, configure_tracing
+from converter import get_data_converter
+from claim_check import get_claim_check_codec, sweep_orphaned_blobs
+from shared_models import PRIORITY_TASK_QUEUES
 
 
 # Configure logging
@@ -14,11 +20,45 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Modules passed through the workflow sandbox instead of being re-imported for
+# every workflow run. Only add modules that are deterministic and have no
+# import-time side effects workflows depend on. Modules the SDK already
+# passes through (pydantic, typing_extensions, ...) and the ones workflows.py
+# imports with imports_passed_through() (shared_models, token_estimate) need
+# no entry here.
+WORKFLOW_PASSTHROUGH_MODULES = (
+    # The data converter and claim-check codec, which run inside the sandbox
+    "converter",
+    "claim_check",
+    # Used by the data converter and not passed through by default
+    "pydantic_core",
+    "annotated_types",
+)
+
+
+def create_workflow_runner() -> SandboxedWorkflowRunner:
+    """Workflow runner with the default sandbox restrictions plus WORKFLOW_PASSTHROUGH_MODULES."""
+    return SandboxedWorkflowRunner(
+        restrictions=SandboxRestrictions.default.with_passthrough_modules(*WORKFLOW_PASSTHROUGH_MODULES)
+    )
+
+
 async def run_worker():
     """Run a Temporal worker that hosts the Claude workflow and activities."""
     # Load environment variables
     load_dotenv()
     
+    # Serves the SDK's worker metrics (sticky cache hit/miss/size/forced
+    # evictions, replay latency, activity latency) plus the activities' own
+    # claude_* metrics for Prometheus
+    runtime = create_runtime(os.environ.get("WORKER_METRICS_ADDRESS", "0.0.0.0:9464"))
+    # Client interceptors also apply to the worker, so workflow and activity
+    # spans continue the trace started by the gateway
+    interceptors = configure_tracing("claude-worker")
+    # Workflow inputs, activity results and query results are (de)serialized
+    # on the worker for every workflow task, so use the faster JSON converter
+    data_converter = get_data_converter()
+    
     # Get Temporal connection settings
     is_cloud = os.environ.get("TEMPORAL_ADDRESS", "").endswith("tmprl.cloud:7233")
     
@@ -42,22 +82,74 @@ async def run_worker():
             os.environ.get("TEMPORAL_ADDRESS", ""),
             namespace=os.environ.get("TEMPORAL_NAMESPACE", "default"),
             tls=tls_config,
+            runtime=runtime,
+            interceptors=interceptors,
+            data_converter=data_converter,
         )
     else:
         # Connect to local Temporal server
         logger.info("Connecting to local Temporal server")
-        client = await Client.connect("localhost:7233")
+        client = await Client.connect(
+            os.environ.get("TEMPORAL_ADDRESS") or "localhost:7233",
+            runtime=runtime,
+            interceptors=interceptors,
+            data_converter=data_converter,
+        )
     
-    # Run a worker for the "claude-queue" task queue
-    logger.info("Starting worker")
-    worker = Worker(
-        client,
-        task_queue="claude-queue",
-        workflows=[ClaudeChatWorkflow],
-        activities=[get_claude_response],
-    )
+    # Number of workflow instances kept in the sticky cache. Evicted
+    # conversations have to be replayed from history on their next message.
+    max_cached_workflows = int(os.environ.get("WORKER_MAX_CACHED_WORKFLOWS", 1000))
+    
+    # Priority lanes this process serves (see PRIORITY_TASK_QUEUES). Run
+    # dedicated background workers with WORKER_PRIORITY_LANES=background.
+    lanes = [lane.strip() for lane in os.environ.get("WORKER_PRIORITY_LANES", "interactive,background").split(",")]
+    unknown = set(lanes) - set(PRIORITY_TASK_QUEUES)
+    if unknown:
+        raise ValueError(f"Unknown WORKER_PRIORITY_LANES: {', '.join(sorted(unknown))}")
+    
+    workers = []
+    if "interactive" in lanes:
+        # Run a worker for the "claude-queue" task queue: the workflows plus
+        # interactive Claude calls
+        logger.info(f"Starting worker (max_cached_workflows={max_cached_workflows})")
+        workers.append(Worker(
+            client,
+            task_queue=PRIORITY_TASK_QUEUES["interactive"],
+            workflows=[ClaudeChatWorkflow, ClaudeBatchWorkflow],
+            activities=[get_claude_response, project_messages, release_payload_blobs],
+            max_cached_workflows=max_cached_workflows,
+            workflow_runner=create_workflow_runner(),
+        ))
+    if "background" in lanes:
+        # Background Claude calls get their own, smaller pool of activity
+        # slots, so a large batch never takes the slots chat turns need
+        max_background_activities = int(os.environ.get("WORKER_BACKGROUND_MAX_CONCURRENT_ACTIVITIES", 20))
+        logger.info(f"Starting background worker (max_concurrent_activities={max_background_activities})")
+        workers.append(Worker(
+            client,
+            task_queue=PRIORITY_TASK_QUEUES["background"],
+            activities=[get_claude_response],
+            max_concurrent_activities=max_background_activities,
+        ))
+    
+    # activities.py imports the Anthropic SDK on first use so startup isn't
+    # blocked on it; load it in the background while the worker starts polling
+    preload = asyncio.create_task(asyncio.to_thread(importlib.import_module, "anthropic"))
+    
+    # Blobs are otherwise only deleted when a later workflow releases its own,
+    # so sweep expired orphans on start and then every CLAIM_CHECK_SWEEP_SECONDS
+    sweep = None
+    codec = get_claim_check_codec()
+    sweep_seconds = float(os.environ.get("CLAIM_CHECK_SWEEP_SECONDS", 300))
+    if codec is not None and sweep_seconds > 0:
+        sweep = asyncio.create_task(sweep_orphaned_blobs(codec, sweep_seconds))
     
-    await worker.run()
+    try:
+        await asyncio.gather(*(worker.run() for worker in workers))
+        await preload
+    finally:
+        if sweep is not None:
+            sweep.cancel()
 
 
 if __name__ == "__main__":
@@ -1,106 +1,358 @@
-from dataclasses import dataclass
+import asyncio
 from datetime import timedelta
 from temporalio import workflow
 from temporalio.common import RetryPolicy
-from shared_models import ClaudePromptInput, ClaudeResponse
 from typing import List, Dict, Optional
-from temporalio.exceptions import ApplicationError
+from temporalio.exceptions import ApplicationError, ActivityError, ChildWorkflowError
 
 import time
 
 with workflow.unsafe.imports_passed_through():
-    from activities import get_claude_response
+    # Passed through so workflows use the same dataclasses as the data
+    # converter, which decodes them with prebuilt schemas (see converter.py),
+    # and so the classes aren't rebuilt in the sandbox for every workflow run
+    from shared_models import (
+        ClaudePromptInput,
+        ClaudeResponse,
+        ClaudeBatchInput,
+        ClaudeBatchItem,
+        ClaudeBatchResult,
+        ProjectMessagesInput,
+        ChatMessage,
+        QueuedMessage,
+        TokenUsage,
+        CLAUDE_MODEL_ATTR,
+        CLAUDE_TURN_COUNT_ATTR,
+        CLAUDE_LAST_ACTIVITY_ATTR,
+        CLAUDE_STATUS_ATTR,
+        TENANT_THROTTLED_ERROR,
+        PRIORITY_TASK_QUEUES,
+    )
+    from token_estimate import context_window, estimate_message_tokens
 
 
-@dataclass
-class ChatMessage:
-    role: str  # "user" or "assistant"
-    content: str
-    timestamp: float
+# Activities are referenced by name rather than imported, so importing this
+# module (the gateway does, for the workflow and update definitions) doesn't
+# load activities.py and the Anthropic SDK
+GET_CLAUDE_RESPONSE = "get_claude_response"
+PROJECT_MESSAGES = "project_messages"
+RELEASE_PAYLOAD_BLOBS = "release_payload_blobs"
+
+
+# Retry policy shared by every get_claude_response call
+CLAUDE_RETRY_POLICY = RetryPolicy(
+    maximum_attempts=3,
+    initial_interval=timedelta(seconds=1),
+    maximum_interval=timedelta(seconds=10),
+)
+
+
+# Backoff between calls deferred by the tenant limit: the delay the activity
+# asks for, doubling per deferral up to the cap, with jitter so throttled
+# workflows don't all call again at the same moment
+TENANT_THROTTLE_MAX_DELAY = timedelta(seconds=30)
+# How long a call waits for its tenant's turn before it fails
+TENANT_THROTTLE_MAX_WAIT = timedelta(minutes=10)
+
+
+def activity_task_queue(priority: str) -> Optional[str]:
+    """
+    Task queue for a Claude call of `priority`. Interactive calls stay on the
+    workflow's own task queue (None), so a worker polling any queue, e.g. a
+    test or benchmark worker, runs them. Other lanes go to their own queue.
+    """
+    if priority not in PRIORITY_TASK_QUEUES or priority == "interactive":
+        return None
+    return PRIORITY_TASK_QUEUES[priority]
+
+
+async def call_claude(input: ClaudePromptInput) -> ClaudeResponse:
+    """
+    Run get_claude_response from a workflow, on the task queue of the input's
+    priority (see activity_task_queue). While the tenant is at its limit of concurrent calls the
+    activity is turned away; back off and call again, without counting that
+    against the retry policy, for up to TENANT_THROTTLE_MAX_WAIT.
+    Args:
+        input: The Claude call, with the tenant and priority it is made for
+    Returns:
+        Claude's response
+    Raises:
+        ActivityError: The call failed, or the tenant stayed at its limit
+            for TENANT_THROTTLE_MAX_WAIT
+    """
+    deferrals = 0
+    first_deferred = None
+    while True:
+        try:
+            return await workflow.execute_activity(
+                GET_CLAUDE_RESPONSE,
+                input,
+                result_type=ClaudeResponse,
+                task_queue=activity_task_queue(input.priority),
+                start_to_close_timeout=timedelta(seconds=30),
+                retry_policy=CLAUDE_RETRY_POLICY,
+            )
+        except ActivityError as e:
+            if not isinstance(e.cause, ApplicationError) or e.cause.type != TENANT_THROTTLED_ERROR:
+                raise
+            base_delay = e.cause.details[0] if e.cause.details else 1
+            if not workflow.patched("tenant-throttle-backoff"):
+                # Workflows deferred before the backoff existed
+                await asyncio.sleep(base_delay)
+                continue
+            
+            # Every deferral adds an activity attempt and a timer to history,
+            # so give up rather than grow it without bound
+            now = workflow.now()
+            first_deferred = first_deferred or now
+            if now - first_deferred >= TENANT_THROTTLE_MAX_WAIT:
+                workflow.logger.warning(
+                    f"Giving up on Claude call after {deferrals} deferrals by the tenant limit"
+                )
+                raise
+            
+            delay = min(base_delay * 2 ** min(deferrals, 10), TENANT_THROTTLE_MAX_DELAY.total_seconds())
+            deferrals += 1
+            await asyncio.sleep(delay * (0.5 + workflow.random().random() / 2))
+
+
+async def release_payload_blobs(workflow_ids: List[str]) -> None:
+    """
+    Garbage-collect the blobs the claim-check codec offloaded for ended
+    workflows. A failure only leaves blobs behind, so it is just logged.
+    Args:
+        workflow_ids: The workflows whose blobs to release
+    """
+    try:
+        await workflow.execute_local_activity(
+            RELEASE_PAYLOAD_BLOBS,
+            workflow_ids,
+            result_type=int,
+            start_to_close_timeout=timedelta(seconds=30),
+            retry_policy=RetryPolicy(maximum_attempts=3),
+        )
+    except ActivityError as e:
+        workflow.logger.warning(f"Failed to release payload blobs: {e}")
+
+
+# Characters of content kept in memory for messages outside the context window
+TRUNCATED_CONTENT_CHARS = 200
+
+
+def chat_settings_error(input: ClaudePromptInput) -> Optional[str]:
+    """
+    Check the settings a chat workflow is started with. The gateway checks
+    them too; this guards workflows started any other way, since a bad value
+    would otherwise fail every workflow task and be retried forever.
+    Returns:
+        What is wrong with the settings, or None if they are valid
+    """
+    def positive_int(value) -> bool:
+        return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+    if not positive_int(input.max_tokens):
+        return f"max_tokens must be a positive integer, got {input.max_tokens!r}"
+    if not positive_int(input.inactivity_timeout_seconds):
+        return f"inactivity_timeout_seconds must be a positive integer, got {input.inactivity_timeout_seconds!r}"
+    cwm = input.context_window_messages
+    if cwm is not None and not positive_int(cwm):
+        return f"context_window_messages must be a positive integer or None, got {cwm!r}"
+    return None
 
 
 @workflow.defn
 class ClaudeChatWorkflow:
-    def __init__(self):
+    @workflow.init
+    def __init__(self, input: ClaudePromptInput):
+        # Settings come from the start input here rather than in run, so an
+        # update delivered with the start (update-with-start) already sees them
         self.messages: List[ChatMessage] = []
-        self.conversation_id: Optional[str] = None
-        self.model: str = "claude-3-7-sonnet-20250219"
-        self.max_tokens: int = 1024
+        self.conversation_id: str = workflow.info().workflow_id
+        self.model: str = input.model
+        self.max_tokens: int = input.max_tokens
+        self.batch_pending_messages: bool = input.batch_pending_messages
+        self.inactivity_timeout_seconds: int = input.inactivity_timeout_seconds
+        self.context_window_messages: Optional[int] = input.context_window_messages
+        self.tenant_id: Optional[str] = input.tenant_id
+        self.priority: str = input.priority
         self.last_activity: float = 0
+        self.turn_count: int = 0
+        self.usage = TokenUsage()
+        # User messages waiting for the run loop, oldest first
+        self.pending: List[QueuedMessage] = []
+        # Messages before this index are in the history store
+        self.projected_until: int = 0
+        # Set by end_conversation
+        self.ended: bool = False
+        # Set once the run loop has exited; no more messages are answered
+        self.closing: bool = False
+        # An exception raised here would fail the workflow task, not the
+        # workflow, and be retried forever; run() fails the workflow instead
+        self.settings_error: Optional[str] = chat_settings_error(input)
     
     @workflow.run
     async def run(self, input: ClaudePromptInput) -> None:
         """
         Start a chat workflow and keep it running to receive more messages.
-        Automatically ends after 30 minutes of inactivity.
+        Ends on end_conversation, or automatically after
+        `inactivity_timeout_seconds` (default 30 minutes) without a new message.
+        An empty initial prompt starts the conversation without a first turn,
+        as done by update-with-start where the message arrives as the update.
+        
+        Signals and updates only enqueue messages; this loop processes them
+        one turn at a time, so every Claude call sees the previous reply.
         """
-        # Store workflow settings from initial input
-        self.model = input.model
-        self.max_tokens = input.max_tokens
+        if self.settings_error is not None:
+            raise ApplicationError(self.settings_error, non_retryable=True)
+        
         self.last_activity = workflow.now().timestamp()
+        self._upsert_search_attributes("idle")
         
         try:
-            # Process the first message
-            await self._process_user_message(input.prompt)
-            
-            # Keep checking for inactivity every 5 minutes
+            # Queue the first message
+            if input.prompt:
+                self._enqueue(input.prompt)
+        
             while True:
+                # Process queued turns in order
+                if self.pending:
+                    self._upsert_search_attributes("processing")
+                    while self.pending:
+                        if self.batch_pending_messages:
+                            # Fold everything queued so far into a single Claude call
+                            batch, self.pending = self.pending, []
+                        else:
+                            batch, self.pending = self.pending[:1], self.pending[1:]
+                        await self._process_turn(batch)
+                    
+                        # Update last activity time
+                        self.last_activity = workflow.now().timestamp()
+                    self._upsert_search_attributes("idle")
+            
+                if self.ended:
+                    # Messages queued before the end were answered above
+                    self._upsert_search_attributes("ended")
+                    break
+            
+                # Sleep until a message is queued, the conversation is ended or
+                # the inactivity deadline passes. One timer per idle period,
+                # instead of a periodic tick.
+                deadline = self.last_activity + self.inactivity_timeout_seconds
+                remaining = deadline - workflow.now().timestamp()
+                if remaining <= 0:
+                    # Conversation expired due to inactivity
+                    self._upsert_search_attributes("expired")
+                    break
                 try:
-                    # Wait for up to 5 minutes, but will be interrupted by signals
-                    await workflow.wait_condition(lambda: False, timeout=timedelta(minutes=5))
+                    await workflow.wait_condition(
+                        lambda: bool(self.pending) or self.ended, timeout=timedelta(seconds=remaining)
+                    )
                 except TimeoutError:
-                    # Check for inactivity timeout (30 minutes)
-                    current_time = workflow.now().timestamp()
-                    if current_time - self.last_activity > 30 * 60:  # 30 minutes in seconds
-                        # Conversation expired due to inactivity
-                        break
-                    # Otherwise continue waiting
-                    continue
-                except workflow.CancelledError:
-                    # Workflow was explicitly cancelled (via end_conversation)
-                    raise  # Re-raise to be caught by outer try/except
-                
-        except workflow.CancelledError:
-            # Handle workflow cancellation gracefully
-            pass
+                    if self.pending or self.ended:
+                        # A message or the end arrived together with the deadline
+                        continue
+                    # Conversation expired due to inactivity
+                    self._upsert_search_attributes("expired")
+                    break
+        
+        except asyncio.CancelledError:
+            # The workflow was cancelled; still close out the conversation
+            self._upsert_search_attributes("ended")
+        
+        # Turn away messages from here on (see validate_chat), rather than
+        # accept them while the blobs are released and then complete
+        # without answering them
+        self.closing = True
+        
+        # The conversation is over; its offloaded payloads can go
+        await release_payload_blobs([self.conversation_id])
     
     @workflow.signal
-    async def send_message(self, message: str) -> None:
+    def send_message(self, message: str) -> None:
         """
         Signal method to send a new message to the chat.
+        The message is queued and processed by the main run loop.
         
         Args:
             message: The new user message
         """
-        # Process the new message
-        await self._process_user_message(message)
+        if self.ended or self.closing:
+            # Signals can't be rejected; at least leave a trace
+            workflow.logger.warning("Dropping message sent after the conversation ended")
+            return
+        self._enqueue(message)
+    
+    @workflow.update
+    async def chat(self, message: str) -> str:
+        """
+        Update method to send a new message and wait for Claude's reply.
+        Unlike send_message, the caller gets the reply from the same call.
         
-        # Update last activity time
-        self.last_activity = workflow.now().timestamp()
+        Args:
+            message: The new user message
+        Returns:
+            Claude's response text
+        """
+        queued = self._enqueue(message)
+        
+        # Wait for the run loop to get to this message
+        await workflow.wait_condition(lambda: queued.done)
+        if queued.error is not None:
+            raise ApplicationError(f"Claude request failed: {queued.error}")
+        
+        return queued.reply
+    
+    @chat.validator
+    def validate_chat(self, message: str) -> None:
+        """Reject empty messages, and messages to a conversation that can't run or has ended, before they are written to history."""
+        if self.settings_error is not None:
+            raise ValueError(self.settings_error)
+        if self.ended or self.closing:
+            raise ValueError("The conversation has ended")
+        if not message or not message.strip():
+            raise ValueError("Message must not be empty")
     
 
     @workflow.signal
     def end_conversation(self) -> None:
-            """
-            Signal method to explicitly end the conversation and terminate the workflow.
-            This triggers workflow cancellation that will be caught in the main run method.
-            """
-            # Use the proper way to cancel a workflow from within
-            raise ApplicationError("User requested to end the conversation")
+        """
+        Signal method to explicitly end the conversation.
+        The run loop answers messages already queued, then completes the
+        workflow and releases its offloaded payloads.
+        """
+        self.ended = True
 
     @workflow.query
-    def get_conversation_history(self) -> List[Dict]:
+    def get_conversation_history(self, since_index: int = 0, limit: Optional[int] = None) -> List[Dict]:
         """
-        Query method to get the entire conversation history.
+        Query method to get the conversation history, or a slice of it.
         
+        Args:
+            since_index: Index of the first message to return, so a client that
+                already has N messages only fetches the new ones
+            limit: Maximum number of messages to return (all if None)
         Returns:
-            List of messages with role, content, and timestamp
+            List of messages with index, role, content, and timestamp. Messages
+            outside the context window are flagged truncated and hold a preview.
         """
+        since_index = max(0, since_index)
+        end = len(self.messages) if limit is None else since_index + max(0, limit)
         return [
-            {"role": msg.role, "content": msg.content, "timestamp": msg.timestamp}
-            for msg in self.messages
+            {"index": i, "role": msg.role, "content": msg.content, "timestamp": msg.timestamp,
+             "truncated": msg.truncated}
+            for i, msg in enumerate(self.messages[since_index:end], start=since_index)
         ]
     
+    @workflow.query
+    def get_token_usage(self) -> TokenUsage:
+        """
+        Query method to get the conversation's token usage.
+        
+        Returns:
+            Token totals across all Claude calls, plus the latest call's prompt size and stop reason
+        """
+        return self.usage
+    
     @workflow.query
     def get_last_assistant_message(self) -> Optional[str]:
         """
@@ -114,53 +366,305 @@ class ClaudeChatWorkflow:
                 return msg.content
         return None
     
-    async def _process_user_message(self, message: str) -> str:
+    def _context_start(self) -> int:
         """
-        Internal method to process a user message and get a response from Claude.
-        Args:
-            message: The user message   
-        Returns:
-            Claude's response text
+        Index of the oldest message sent to Claude under the context policy:
+        at most context_window_messages messages, and no more than fit the
+        model's context window next to max_tokens by estimate.
         """
-        # Record the user message
-        self.messages.append(ChatMessage(
-            role="user",
-            content=message,
-            timestamp=workflow.now().timestamp()
-        ))
+        start = 0
+        if self.context_window_messages is not None:
+            start = max(0, len(self.messages) - self.context_window_messages)
         
-        # Set up a retry policy for the activity
-        retry_policy = RetryPolicy(
-            maximum_attempts=3,
-            initial_interval=timedelta(seconds=1),
-            maximum_interval=timedelta(seconds=10),
-        )
+        # Drop the oldest messages until the prompt fits. Each message's
+        # estimate is computed once, when it is added.
+        budget = context_window(self.model) - self.max_tokens
+        tokens = sum(msg.tokens for msg in self.messages[start:])
+        while tokens > budget and start < len(self.messages) - 1:
+            tokens -= self.messages[start].tokens
+            start += 1
+        
+        # Claude expects the conversation to open with a user message
+        while start < len(self.messages) - 1 and self.messages[start].role != "user":
+            start += 1
+        return start
+    
+    def _truncate_old_messages(self) -> None:
+        """
+        Cut messages the next turn can no longer send to Claude down to a short
+        preview, so a long conversation doesn't grow the cached workflow without
+        bound. The full text stays in event history and the history store.
+        """
+        if self.context_window_messages is None:
+            return
+        for i in range(len(self.messages) - self.context_window_messages - 1, -1, -1):
+            msg = self.messages[i]
+            if msg.truncated:
+                # Everything older was truncated on an earlier turn
+                break
+            if i >= self.projected_until:
+                # Not in the history store yet; keep the full text until it is
+                continue
+            msg.content = msg.content[:TRUNCATED_CONTENT_CHARS]
+            msg.tokens = estimate_message_tokens(msg.content)
+            msg.truncated = True
+    
+    def _upsert_search_attributes(self, status: str) -> None:
+        """Publish the conversation's state to visibility for /api/conversations."""
+        workflow.upsert_search_attributes([
+            CLAUDE_MODEL_ATTR.value_set(self.model),
+            CLAUDE_TURN_COUNT_ATTR.value_set(self.turn_count),
+            CLAUDE_LAST_ACTIVITY_ATTR.value_set(workflow.now()),
+            CLAUDE_STATUS_ATTR.value_set(status),
+        ])
+    
+    def _enqueue(self, message: str) -> QueuedMessage:
+        """Queue a user message for the run loop."""
+        queued = QueuedMessage(content=message, timestamp=workflow.now().timestamp())
+        self.pending.append(queued)
+        return queued
+    
+    async def _process_turn(self, batch: List[QueuedMessage]) -> None:
+        """
+        Internal method to run one turn: record the queued user messages and
+        get a single response from Claude for them.
+        Args:
+            batch: Queued user messages, oldest first
+        """
+        # Record the user messages
+        first_new = len(self.messages)
+        for queued in batch:
+            self.messages.append(ChatMessage(
+                role="user",
+                content=queued.content,
+                timestamp=queued.timestamp,
+                tokens=estimate_message_tokens(queued.content),
+            ))
         
         # Prepare the prompt with conversation history
         # For Claude, we need to format the conversation history as messages
-        messages_for_claude = [
-            {"role": msg.role, "content": msg.content}
-            for msg in self.messages
-        ]
+        context = self.messages[self._context_start():]
+        messages_for_claude = [{"role": msg.role, "content": msg.content} for msg in context]
+        prompt_tokens = sum(msg.tokens for msg in context)
+        
+        window = context_window(self.model)
+        if prompt_tokens + self.max_tokens > window and workflow.patched("context-window-guard"):
+            # Even the newest messages alone don't fit. Claude would reject
+            # the call on every retry, so answer with an error right away.
+            error = (
+                f"Message too long: about {prompt_tokens} tokens plus max_tokens {self.max_tokens} "
+                f"exceeds the {window}-token context window of {self.model}"
+            )
+            workflow.logger.warning(error)
+            del self.messages[first_new:]
+            for queued in batch:
+                queued.error = error
+                queued.done = True
+            return
         
-        # Call Claude with the conversation history
-        response = await workflow.execute_activity(
-            get_claude_response,
-            ClaudePromptInput(
-                prompt=message,  # Current message
+        try:
+            # Call Claude with the conversation history
+            response = await call_claude(ClaudePromptInput(
+                prompt=batch[-1].content,  # Current message
                 model=self.model,
                 max_tokens=self.max_tokens,
-                conversation_history=messages_for_claude  # Include full history
-            ),
-            start_to_close_timeout=timedelta(seconds=30),
-            retry_policy=retry_policy,
-        )
+                conversation_history=messages_for_claude,  # Include full history
+                tenant_id=self.tenant_id,
+                priority=self.priority,
+                estimated_input_tokens=prompt_tokens,
+            ))
+        except ActivityError as e:
+            workflow.logger.warning(f"Claude request failed for {len(batch)} queued message(s): {e}")
+            # Drop the unanswered messages so a resend doesn't duplicate them
+            del self.messages[first_new:]
+            for queued in batch:
+                queued.error = str(e.cause or e)
+                queued.done = True
+            return
         
         # Record Claude's response
         self.messages.append(ChatMessage(
             role="assistant",
             content=response.text,
-            timestamp=workflow.now().timestamp()
+            timestamp=workflow.now().timestamp(),
+            tokens=estimate_message_tokens(response.text),
         ))
+        self.turn_count += 1
+        self.usage.add(response)
         
-        return response.text
\ No newline at end of file
+        for queued in batch:
+            queued.reply = response.text
+            queued.done = True
+        
+        await self._project_messages()
+        self._truncate_old_messages()
+    
+    async def _project_messages(self) -> None:
+        """
+        Copy messages not yet in the read-side history store into it. A failed
+        write doesn't fail the turn: the messages are written with the next
+        turn's, so the store catches up instead of keeping a gap.
+        """
+        try:
+            await workflow.execute_local_activity(
+                PROJECT_MESSAGES,
+                ProjectMessagesInput(
+                    conversation_id=self.conversation_id,
+                    messages=self.get_conversation_history(self.projected_until),
+                    usage=self.usage,
+                ),
+                start_to_close_timeout=timedelta(seconds=5),
+                retry_policy=RetryPolicy(maximum_attempts=3),
+            )
+        except ActivityError as e:
+            workflow.logger.warning(f"Failed to project messages to the history store: {e}")
+            return
+        self.projected_until = len(self.messages)
+
+
+def chunk_workflow_id(batch_id: str, start_index: int) -> str:
+    """Workflow ID of the child running a batch's chunk starting at start_index."""
+    return f"{batch_id}-chunk-{start_index}"
+
+
+@workflow.defn
+class ClaudeBatchWorkflow:
+    """
+    Fan-out/fan-in workflow that runs many independent prompts through Claude.
+
+    Inputs with at most `chunk_size` prompts are processed here, with at most
+    `max_concurrency` activities in flight. Larger inputs are split into chunks
+    that each run as a child ClaudeBatchWorkflow, so no single event history
+    grows with the size of the whole batch; the running children split
+    `max_concurrency` between them.
+    """
+
+    def __init__(self):
+        self.total: int = 0
+        self.completed: int = 0
+        self.failed: int = 0
+        self.usage = TokenUsage()
+
+    @workflow.run
+    async def run(self, input: ClaudeBatchInput) -> ClaudeBatchResult:
+        """
+        Run every prompt in the batch and aggregate the results.
+        Args:
+            input: The prompts plus model settings and parallelism limits
+        Returns:
+            One ClaudeBatchItem per prompt, ordered by index
+        """
+        self.total = len(input.prompts)
+        if input.chunk_size < 1:
+            # range() would raise in every workflow task and retry forever
+            raise ApplicationError(f"chunk_size must be positive, got {input.chunk_size}", non_retryable=True)
+        max_concurrency = max(1, input.max_concurrency)
+
+        children: List[str] = []
+        if self.total > input.chunk_size:
+            chunks = [
+                input.prompts[i:i + input.chunk_size]
+                for i in range(0, self.total, input.chunk_size)
+            ]
+            # Split the concurrency across the children that run at once, so
+            # the whole batch has at most max_concurrency activities in flight
+            # (not max_concurrency children running max_concurrency each).
+            # A child takes a share when it starts and hands it on when done.
+            running = min(max_concurrency, len(chunks))
+            shares: asyncio.Queue = asyncio.Queue()
+            for n in range(running):
+                shares.put_nowait(max_concurrency // running + (1 if n < max_concurrency % running else 0))
+            results = await asyncio.gather(*[
+                self._run_chunk(shares, input, chunk, input.start_index + n * input.chunk_size)
+                for n, chunk in enumerate(chunks)
+            ])
+            children = [
+                chunk_workflow_id(workflow.info().workflow_id, input.start_index + n * input.chunk_size)
+                for n in range(len(chunks))
+            ]
+            items = [item for chunk_items in results for item in chunk_items]
+        else:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            items = await asyncio.gather(*[
+                self._run_prompt(semaphore, input, prompt, input.start_index + i)
+                for i, prompt in enumerate(input.prompts)
+            ])
+
+        if workflow.info().parent is None and workflow.patched("release-batch-blobs"):
+            # The chunk children's results are in this workflow's history, so
+            # their blobs are released together with its own, once it is done.
+            # The result is encoded after this, so its blob is kept.
+            await release_payload_blobs([workflow.info().workflow_id] + children)
+
+        return ClaudeBatchResult(items=list(items), usage=self.usage)
+
+    @workflow.query
+    def get_progress(self) -> Dict[str, int]:
+        """
+        Query method to get batch progress.
+
+        Child workflows report back as a whole, so for chunked batches the
+        counts advance one chunk at a time.
+
+        Returns:
+            Total, completed and failed prompt counts
+        """
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    async def _run_prompt(
+        self, semaphore: asyncio.Semaphore, input: ClaudeBatchInput, prompt: str, index: int
+    ) -> ClaudeBatchItem:
+        """Run a single prompt; a failed prompt is recorded rather than failing the batch."""
+        async with semaphore:
+            try:
+                response = await call_claude(ClaudePromptInput(
+                    prompt=prompt,
+                    model=input.model,
+                    max_tokens=input.max_tokens,
+                    tenant_id=input.tenant_id,
+                    priority=input.priority,
+                ))
+                item = ClaudeBatchItem(index=index, text=response.text, request_id=response.request_id)
+                self.usage.add(response)
+            except ActivityError as e:
+                item = ClaudeBatchItem(index=index, error=str(e.cause or e))
+                self.failed += 1
+        self.completed += 1
+        return item
+
+    async def _run_chunk(
+        self, shares: asyncio.Queue, input: ClaudeBatchInput, prompts: List[str], start_index: int
+    ) -> List[ClaudeBatchItem]:
+        """Run a chunk of prompts as a child workflow, with a share of the batch's concurrency."""
+        share = await shares.get()
+        try:
+            result = await workflow.execute_child_workflow(
+                ClaudeBatchWorkflow.run,
+                ClaudeBatchInput(
+                    prompts=prompts,
+                    model=input.model,
+                    max_tokens=input.max_tokens,
+                    max_concurrency=share,
+                    chunk_size=input.chunk_size,
+                    start_index=start_index,
+                    tenant_id=input.tenant_id,
+                    priority=input.priority,
+                ),
+                id=chunk_workflow_id(workflow.info().workflow_id, start_index),
+            )
+            items = result.items
+            self.usage.merge(result.usage)
+        except ChildWorkflowError as e:
+            items = [
+                ClaudeBatchItem(index=start_index + i, error=str(e.cause or e))
+                for i in range(len(prompts))
+            ]
+        finally:
+            shares.put_nowait(share)
+        self.completed += len(items)
+        self.failed += sum(1 for item in items if item.error is not None)
+        return items